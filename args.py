@@ -1,7 +1,7 @@
 import argparse
 
 
-def get_args():
+def get_args(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--nodes", type=int, default=100)
     parser.add_argument("--runs-per-process", type=int, default=1000)
@@ -11,15 +11,60 @@ def get_args():
     parser.add_argument("--k", type=int, default=7)
     parser.add_argument("--seed", type=int, default=42)
     parser.add_argument("--cpus", type=int, default=None)
+    # The --runs-per-process x --cpus runs are handed out to the workers in chunks of this many runs, as they become free.
+    # By default, every CPU gets about 16 chunks.
+    parser.add_argument("--chunk-size", type=int, default=None)
 
     # Toggle this to run the basic, quicker protocol without actual message passing without node.
     # The basic version of the simulator simply maintains a graph and changes node positions.
     parser.add_argument('--basic', action=argparse.BooleanOptionalAction)
+    # The engine used in basic mode. The vectorized engine draws all edge activations of a run at once, and the batched
+    # engine additionally advances --batch-size runs together. Larger batches are faster but use more memory.
+    # The traced engine only follows the nodes around the tracked nodes and does not support --track-all-nodes.
+    parser.add_argument('--engine', type=str, default="heap", choices=["heap", "vectorized", "batched", "traced"])
+    parser.add_argument('--batch-size', type=int, default=1000)
 
     parser.add_argument('--profile', action=argparse.BooleanOptionalAction)
+    # Collect event counts, queue depths and failed swaps by reason of the lock-based simulator, per run.
+    parser.add_argument('--metrics', action=argparse.BooleanOptionalAction)
     parser.add_argument('--track-all-nodes', action=argparse.BooleanOptionalAction)
+    # Track the neighbourhoods of a random sample of this many nodes, which is the same in every process.
+    parser.add_argument('--track-nodes', type=int, default=None)
     parser.add_argument('--track-swap-times', action=argparse.BooleanOptionalAction)
     parser.add_argument('--latencies-file', type=str, default=None)
+    # Draw new random latencies for every run. Disable to reuse the latencies drawn at the start of each process.
+    parser.add_argument('--redraw-latencies', action=argparse.BooleanOptionalAction, default=True)
     parser.add_argument('--log-level', type=str, default="ERROR")
+    # Export the merged results as CSV files, next to the binary .npz/.npy files.
+    parser.add_argument('--csv-export', action=argparse.BooleanOptionalAction, default=True)
 
-    return parser.parse_args()
+    # The results are saved at most once per this many seconds (0 disables checkpoints). With --resume, an experiment
+    # continues from its last checkpoint instead of starting over.
+    parser.add_argument('--checkpoint-interval', type=float, default=300)
+    parser.add_argument('--resume', action=argparse.BooleanOptionalAction)
+
+    # Stop an experiment early once the distance between the neighbour frequencies of every tracked node and the uniform
+    # distribution is known up to this precision (the half-width of its confidence interval). The total-variation
+    # distance (tv) or chi-square divergence (chi2) is computed whenever a chunk of runs is done, and the number of runs
+    # given by --runs-per-process and --cpus becomes an upper bound.
+    parser.add_argument('--target-precision', type=float, default=None)
+    parser.add_argument('--convergence-metric', type=str, default="tv", choices=["tv", "chi2"])
+    parser.add_argument('--confidence', type=float, default=0.95)
+
+    # The event queue used by the lock-based simulator. The calendar queue is an alternative to the default binary heap,
+    # which is slower at the sizes in scripts/benchmark_event_queue.py.
+    parser.add_argument('--event-queue', type=str, default="heap", choices=["heap", "calendar"])
+
+    args = parser.parse_args(argv)
+    if args.engine == "traced" and args.track_all_nodes:
+        parser.error("the traced engine does not support --track-all-nodes")
+    if args.track_nodes is not None:
+        if args.track_all_nodes:
+            parser.error("--track-nodes cannot be combined with --track-all-nodes")
+        if not 1 <= args.track_nodes <= args.nodes:
+            parser.error("--track-nodes must be between 1 and the number of nodes")
+    if args.target_precision is not None and args.target_precision <= 0:
+        parser.error("--target-precision must be positive")
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence must be between 0 and 1")
+    return args
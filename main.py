@@ -1,274 +1,419 @@
-import csv
 import logging
+import math
 import multiprocessing
 import os
 import shutil
 import time
 import yappi
 from args import get_args
-from collections import defaultdict
-from multiprocessing import Process
-from typing import List, Dict, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
-from networkx import random_regular_graph
+import numpy as np
 
+from peerswap.convergence import ConvergenceMonitor
+from peerswap.graphs import load_edges
+from peerswap.latency import create_latency_model, load_latency_matrix
+from peerswap.metrics import SimulationMetrics
+from peerswap.results import MAX_DENSE_KEYS, Checkpointer, NeighbourhoodCounts, ProcessResults
 from peerswap.simulation_basic import Simulation
 from peerswap.simulation_lock import SimulationWithLock
-
-
-def run_basic(process_index: int, args, data_dir):
+from peerswap.simulation_vectorized import VectorizedSimulation, BatchedSimulation, BackwardTracingSimulation
+from peerswap.tracking import get_tracked_nodes
+
+
+def write_csv_export(data_dir: str, prefix: str, counts: NeighbourhoodCounts):
+    """
+    Export the merged neighbourhood counts to the CSV files read by the plotting scripts.
+    """
+    # The node frequencies are exported as the full grid of tracked nodes and nodes, including the nodes that have never
+    # been seen, whether they are counted in a dense array or not. The grid is written in blocks of tracked nodes.
+    nb_keys, nb_freqs = counts.nb_frequencies.get_arrays()
+    block_size: int = max(1, MAX_DENSE_KEYS // counts.nodes)
+    with open(os.path.join(data_dir, "frequencies.csv"), "w") as out_file:
+        out_file.write("algorithm,nodes,k,time_per_run,seed,max_network_delay,tracked_node,node,freq\n")
+        for block_start in range(0, len(counts.tracked_nodes), block_size):
+            first_key: int = block_start * counts.nodes
+            block_keys: np.ndarray = np.arange(first_key, min(block_start + block_size, len(counts.tracked_nodes)) *
+                                               counts.nodes)
+            block_freqs: np.ndarray = np.zeros(len(block_keys), dtype=np.int64)
+            start, end = np.searchsorted(nb_keys, [block_keys[0], block_keys[-1] + 1])
+            block_freqs[nb_keys[start:end] - first_key] = nb_freqs[start:end]
+            tracked_indices, nbs = np.divmod(block_keys, counts.nodes)
+            np.savetxt(out_file, np.column_stack((counts.tracked_nodes[tracked_indices], nbs, block_freqs)),
+                       fmt=prefix + "%d,%d,%d")
+
+    # Neighbourhoods are only decoded here
+    nbh_keys, nbh_counts = counts.nbh_frequencies.get_arrays()
+    nbh_tracked_nodes, nbhs = counts.decode(nbh_keys)
+    nbh_fmt: str = prefix + "%d," + "-".join(["%d"] * nbhs.shape[1]) + ",%d"
+    np.savetxt(os.path.join(data_dir, "nbh_frequencies.csv"), np.column_stack((nbh_tracked_nodes, nbhs, nbh_counts)),
+               fmt=nbh_fmt, header="algorithm,nodes,k,time_per_run,seed,max_network_delay,tracked_node,nbh,freq",
+               comments="")
+    with open(os.path.join(data_dir, "nbh_frequencies.csv"), "a") as out_file:
+        for key, freq in counts.irregular_nbh_frequencies.items():
+            nbh_str = "-".join(["%d" % nb for nb in key[1:]])
+            out_file.write("%s%d,%s,%d\n" % (prefix, key[0], nbh_str, freq))
+
+
+# State of a worker process that is shared by all chunks of runs it executes. Graphs and the state of the lock-based
+# simulator are cached per configuration, so a worker can alternate between the configurations of a sweep.
+worker_state = {}
+
+# Maximum number of configurations for which a worker keeps its graphs and simulator state
+MAX_CACHED_CONFIGS = 4
+
+
+def init_worker(args, stop_flags=None):
+    logging.basicConfig(level=getattr(logging, args.log_level))
     if args.profile:
         yappi.start(builtins=True)
 
-    total_swaps: int = 0
-    nb_frequencies: Dict[int, List[int]] = {}
-    nbh_frequencies: Dict[int, Dict[Tuple[int], int]] = {}
-    if args.track_all_nodes:
-        for node in range(args.nodes):
-            nb_frequencies[node] = [0] * args.nodes
-            nbh_frequencies[node] = defaultdict(lambda: 0)
-    else:
-        nb_frequencies = {0: [0] * args.nodes}
-        nbh_frequencies = {0: defaultdict(lambda: 0)}
+    # Set by the parent for experiments that have converged, whose remaining runs are skipped
+    worker_state["stop_flags"] = stop_flags
 
-    start_time = time.time()
-    G = random_regular_graph(args.k, args.nodes, seed=args.seed)
-    for run_index in range(args.runs_per_process):
-        if run_index % 100000 == 0:
-            logging.info("Process %d completed %d runs..." % (process_index, run_index))
 
-        simulation = Simulation(args, G)
-        simulation.run()
-        total_swaps += simulation.swaps
+def get_cached(name: str, key: Tuple, create: Callable):
+    """
+    Return the value in the worker cache with the given name and key, and create it when it is not there yet.
+    """
+    cache: Dict = worker_state.setdefault(name, {})
+    if key not in cache:
+        if len(cache) >= MAX_CACHED_CONFIGS:
+            del cache[next(iter(cache))]
+        cache[key] = create()
+    return cache[key]
 
-        nbhs = simulation.get_neighbour_of_tracked_nodes()
-        for node, nbh in nbhs.items():
-            for nb in nbh:
-                nb_frequencies[node][nb] += 1
-            nbh_frequencies[node][nbh] += 1
 
-    print("Experiment took %f s., swaps done: %d" % (time.time() - start_time, total_swaps))
+def get_edges(args) -> np.ndarray:
+    return get_cached("graphs", (args.nodes, args.k, args.seed), lambda: load_edges(args.nodes, args.k, args.seed))
 
-    if args.profile:
-        yappi.stop()
-        yappi_stats = yappi.get_func_stats()
-        yappi_stats.sort("tsub")
-        yappi_stats.save(os.path.join(data_dir, "yappi_%d.stats" % process_index), type='callgrind')
-
-    # Write away the results
-    with open(os.path.join(data_dir, "frequencies_%d.csv" % process_index), "w") as out_file:
-        out_file.write("tracked_node,node,freq\n")
-        for tracked_node, nbhs in nb_frequencies.items():
-            for node_id, freq in enumerate(nbhs):
-                out_file.write("%d,%d,%d\n" % (tracked_node, node_id, freq))
-
-    with open(os.path.join(data_dir, "nbh_frequencies_%d.csv" % process_index), "w") as out_file:
-        out_file.write("tracked_node,neighbourhood,freq\n")
-        for tracked_node, nbhs in nbh_frequencies.items():
-            for neighbourhood, freq in nbhs.items():
-                nbh_str = "-".join(["%d" % nb for nb in neighbourhood])
-                out_file.write("%d,%s,%d\n" % (tracked_node,nbh_str, freq))
-
-
-def run(process_index: int, args, data_dir):
-    if args.profile:
-        yappi.start(builtins=True)
 
-    logging.basicConfig(level=getattr(logging, args.log_level))
+def get_lock_state(args) -> Dict:
+    """
+    The latency model of the lock-based simulator, which is reused by all runs with the same configuration, and whether
+    it has been used for a run yet.
+    """
+    key = (args.nodes, args.k, args.seed, args.latencies_file, args.max_network_latency)
+    return get_cached("lock_states", key, lambda: {"latency_model": create_latency_model(args), "used": False})
 
-    total_swaps: int = 0
-    failed_swaps: int = 0
-    nb_frequencies: Dict[int, List[int]] = {}
-    nbh_frequencies: Dict[int, Dict[Tuple[int], int]] = {}
-    swap_durations: List[float] = []
-    peer_locked_time: Dict[int, float] = {}
-    for node in range(args.nodes):
-        peer_locked_time[node] = 0
-
-    if args.track_all_nodes:
-        for node in range(args.nodes):
-            nb_frequencies[node] = [0] * args.nodes
-            nbh_frequencies[node] = defaultdict(lambda: 0)
-    else:
-        nb_frequencies = {0: [0] * args.nodes}
-        nbh_frequencies = {0: defaultdict(lambda: 0)}
 
-    start_time = time.time()
-    G = random_regular_graph(args.k, args.nodes, seed=args.seed)
-    for run_index in range(args.runs_per_process):
-        if run_index % 100000 == 0:
-            logging.info("Process %d completed %d runs..." % (process_index, run_index))
+def get_simulation(args, create: Callable, key: Tuple = ()):
+    """
+    Return the simulation of this worker, reset in place for a new run, if it was created with the same arguments and
+    key. Otherwise, it is replaced by a new simulation. This avoids rebuilding the simulator state for every run.
+    """
+    if worker_state.get("simulation_key") != (args, key):
+        worker_state["simulation"] = create()
+        worker_state["simulation_key"] = (args, key)
+    else:
+        worker_state["simulation"].reset()
+    return worker_state["simulation"]
+
+
+def save_profile(data_dir):
+    # Workers only stop with the pool, so the profile so far is saved after every chunk
+    yappi_stats = yappi.get_func_stats()
+    yappi_stats.sort("tsub")
+    yappi_stats.save(os.path.join(data_dir, "yappi_%d.stats" % os.getpid()), type='callgrind')
+
+
+def get_chunks(first_run: int, num_runs: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Split the given number of runs into chunks, given by the index of their first run and their number of runs.
+    """
+    end: int = first_run + num_runs
+    return [(chunk_start, min(chunk_size, end - chunk_start)) for chunk_start in range(first_run, end, chunk_size)]
+
+
+def get_chunk_size(args, total_runs: int, cpus: int) -> int:
+    """
+    Without --chunk-size, every CPU gets about 16 chunks, so a slow chunk can only delay the end of the experiment a bit.
+    """
+    chunk_size: int = args.chunk_size or max(1, math.ceil(total_runs / (cpus * 16)))
+    if args.basic and args.engine == "batched":
+        # Avoid partial batches
+        chunk_size = math.ceil(chunk_size / args.batch_size) * args.batch_size
+    return chunk_size
+
+
+def print_progress(runs_done: int, total_runs: int, runs_since_start: int, start_time: float):
+    elapsed: float = time.time() - start_time
+    runs_per_sec: float = runs_since_start / elapsed if elapsed > 0 else 0
+    eta: str = "%ds" % ((total_runs - runs_done) / runs_per_sec) if runs_per_sec > 0 else "-"
+    print("\rRuns done: %d/%d (%.1f%%), %.1f runs/s, ETA: %s   " %
+          (runs_done, total_runs, 100 * runs_done / total_runs, runs_per_sec, eta), end="", flush=True)
+
+
+def run_basic(chunk: Tuple[int, int], args, data_dir, should_stop: Callable[[], bool] = lambda: False) -> ProcessResults:
+    chunk_start, chunk_runs = chunk
+    results = ProcessResults(get_tracked_nodes(args), args.nodes, args.k)
+    edges = get_edges(args)
+    if args.engine == "batched":
+        for batch_start in range(0, chunk_runs, args.batch_size):
+            if should_stop():
+                break
+            batch_size: int = min(args.batch_size, chunk_runs - batch_start)
+            simulation = get_simulation(args, lambda: BatchedSimulation(args, edges, args.batch_size))
+            if simulation.batch_size != batch_size:
+                # The last batch of a chunk can be smaller, which reuses part of the simulation
+                simulation.reset(batch_size=batch_size)
+            simulation.run()
+            results.runs += simulation.batch_size
+            results.swaps += simulation.swaps
+            results.counts.add_neighbourhood_batch(simulation.get_neighbourhoods_of_tracked_nodes())
+    else:
+        for _ in range(chunk_runs):
+            if should_stop():
+                break
+            if args.engine == "vectorized":
+                simulation = get_simulation(args, lambda: VectorizedSimulation(args, edges=edges))
+            elif args.engine == "traced":
+                simulation = get_simulation(args, lambda: BackwardTracingSimulation(args, edges=edges))
+            else:
+                simulation = get_simulation(args, lambda: Simulation(args, edges=edges))
+            simulation.run()
+            results.runs += 1
+            results.swaps += simulation.swaps
+            results.counts.add_neighbourhoods(simulation.get_neighbour_of_tracked_nodes())
 
+    if args.profile:
+        save_profile(data_dir)
+
+    # Only send the unique neighbourhoods to the parent process
+    results.counts.compact()
+    return results
+
+
+def run(chunk: Tuple[int, int], args, data_dir, should_stop: Callable[[], bool] = lambda: False) -> ProcessResults:
+    chunk_start, chunk_runs = chunk
+    results = ProcessResults(get_tracked_nodes(args), args.nodes, args.k)
+    edges = get_edges(args)
+    lock_state = get_lock_state(args)
+    latency_model = lock_state["latency_model"]
+    for run_index in range(chunk_start, chunk_start + chunk_runs):
+        if should_stop():
+            break
         while True:
             try:
-                simulation = SimulationWithLock(args, G)
+                # The latencies drawn when the latency model was created are used for its first run
+                if args.redraw_latencies and lock_state["used"]:
+                    latency_model.redraw()
+                lock_state["used"] = True
+                simulation = get_simulation(args, lambda: SimulationWithLock(args, latency_model=latency_model,
+                                                                             edges=edges), (latency_model,))
                 simulation.run()
-                total_swaps += simulation.swaps
-                failed_swaps += simulation.failed_swaps
-                swap_durations = simulation.swap_durations
+                results.swaps += simulation.swaps
+                results.failed_swaps += simulation.failed_swaps
+                results.swap_durations.merge(simulation.swap_durations)
                 break
             except Exception as exc:
                 logging.exception(exc)
                 print("Whoops - failed, trying that again")
 
-        nbhs = simulation.get_neighbour_of_tracked_nodes()
-        for node, nbh in nbhs.items():
-            for nb in nbh:
-                nb_frequencies[node][nb] += 1
-            nbh_frequencies[node][nbh] += 1
+        results.counts.add_neighbourhoods(simulation.get_neighbour_of_tracked_nodes())
+        peer_locked_time: List[float] = [peer.total_time_locked for peer in simulation.peers]
+        results.peer_locked_time += peer_locked_time
+        results.locked_times.add(peer_locked_time)
 
-        for node in range(args.nodes):
-            peer_locked_time[node] += simulation.peers[node].total_time_locked
-
-    print("Experiment took %f s., swaps done: %d, failed swaps: %d" % (time.time() - start_time, total_swaps, failed_swaps))
+        if args.metrics:
+            results.metrics_rows.append("%d,%s\n" % (run_index, simulation.metrics.to_csv_row()))
+        results.runs += 1
 
     if args.profile:
-        yappi.stop()
-        yappi_stats = yappi.get_func_stats()
-        yappi_stats.sort("tsub")
-        yappi_stats.save(os.path.join(data_dir, "yappi_%d.stats" % process_index), type='callgrind')
-
-    # Write away the results
-    with open(os.path.join(data_dir, "frequencies_%d.csv" % process_index), "w") as out_file:
-        out_file.write("tracked_node,node,freq\n")
-        for tracked_node, nbhs in nb_frequencies.items():
-            for node_id, freq in enumerate(nbhs):
-                out_file.write("%d,%d,%d\n" % (tracked_node, node_id, freq))
-
-    with open(os.path.join(data_dir, "nbh_frequencies_%d.csv" % process_index), "w") as out_file:
-        out_file.write("tracked_node,neighbourhood,freq\n")
-        for tracked_node, nbhs in nbh_frequencies.items():
-            for neighbourhood, freq in nbhs.items():
-                nbh_str = "-".join(["%d" % nb for nb in neighbourhood])
-                out_file.write("%d,%s,%d\n" % (tracked_node,nbh_str, freq))
-
-    with open(os.path.join(data_dir, "peer_time_locked_%d.csv" % process_index), "w") as out_file:
-        out_file.write("node,avg_time_locked\n")
-        for node in range(args.nodes):
-            out_file.write("%d,%g\n" % (node, peer_locked_time[node] / args.runs_per_process))
-
-    with open(os.path.join(data_dir, "avg_swap_times_%d.csv" % process_index), "w") as out_file:
-        out_file.write("duration\n")
-        for duration in swap_durations:
-            out_file.write("%g\n" % duration)
+        save_profile(data_dir)
 
+    # Only send the unique neighbourhoods to the parent process
+    results.counts.compact()
+    return results
 
-if __name__ == "__main__":
-    args = get_args()
 
-    # How many CPUs do we have?
-    cpus_to_use = args.cpus or multiprocessing.cpu_count() - 2  # Don't be greedy and use all the CPUs :)
+def run_chunk(task: Tuple[int, "Experiment", Tuple[int, int]]) -> Tuple[int, ProcessResults]:
+    exp_index, experiment, chunk = task
+    worker = run_basic if experiment.args.basic else run
+    stop_flags = worker_state["stop_flags"]
+    should_stop: Callable[[], bool] = (lambda: stop_flags[exp_index] != 0) if stop_flags is not None else (lambda: False)
+    return exp_index, worker(chunk, experiment.args, experiment.data_dir, should_stop)
 
-    print("Will start experiments on %d CPUs..." % cpus_to_use)
 
+def get_data_dir(args, with_rate: bool = False) -> str:
+    """
+    The data directory of a configuration. The Poisson rate is only part of the name when asked for, which sweeps do to
+    tell apart configurations that only differ in their rate.
+    """
     dir_name = "n_%d_k_%d_t_%g_s_%d" % (args.nodes, args.k, args.time_per_run, args.seed)
+    if with_rate:
+        dir_name += "_r_%g" % args.poisson_rate
     if not args.basic:
         if args.latencies_file:
             dir_name += "_l_traces"
         else:
             dir_name += "_l_%g" % args.max_network_latency
-    data_dir = os.path.join("data", dir_name)
-    if os.path.exists(data_dir):
-        shutil.rmtree(data_dir)
-    os.makedirs(data_dir, exist_ok=True)
-
-    processes = []
-    for process_index in range(cpus_to_use):
-        p = Process(target=run_basic if args.basic else run, args=(process_index, args, data_dir))
-        p.start()
-        processes.append(p)
-
-    for p in processes:
-        p.join()
-
-    print("Processes done - combining results")
-
-    # Merge node frequencies
-    merged_frequencies: Dict[int, List[int]] = {}
-    input_files = [os.path.join(data_dir, "frequencies_%d.csv" % process_index) for process_index in range(cpus_to_use)]
-    for input_file in input_files:
-        with open(input_file, "r") as in_file:
-            reader = csv.reader(in_file)
-            next(reader)  # Skip the header
-            for row in reader:
-                tracked_node, node_id, freq = int(row[0]), int(row[1]), int(row[2])
-                if tracked_node not in merged_frequencies:
-                    merged_frequencies[tracked_node] = [0] * args.nodes
-                merged_frequencies[tracked_node][node_id] += freq
-        os.remove(input_file)
-
-    group = "traces" if args.latencies_file else "0-%d ms" % int(args.max_network_latency * 1000)
-    output_file_name = os.path.join(data_dir, "frequencies.csv")
-    with open(output_file_name, "w") as out_file:
-        out_file.write("algorithm,nodes,k,time_per_run,seed,max_network_delay,tracked_node,node,freq\n")
-        for tracked_node, freqs in merged_frequencies.items():
-            for node_ind, freq in enumerate(freqs):
-                out_file.write("swiftpeer,%d,%d,%g,%d,%s,%d,%d,%d\n" % (args.nodes, args.k, args.time_per_run, args.seed, group, tracked_node, node_ind, freq))
-
-    # Merge neighbourhoods
-    merged_nbh_frequencies: Dict[int, Dict[Tuple[int], int]] = {}
-    input_files = [os.path.join(data_dir, "nbh_frequencies_%d.csv" % process_index) for process_index in range(cpus_to_use)]
-    for input_file in input_files:
-        with open(input_file, "r") as in_file:
-            reader = csv.reader(in_file)
-            next(reader)  # Skip the header
-            for row in reader:
-                tracked_node, nbh, freq = int(row[0]), row[1], int(row[2])
-                if tracked_node not in merged_nbh_frequencies:
-                    merged_nbh_frequencies[tracked_node] = defaultdict(lambda: 0)
-
-                nbh = tuple([int(part) for part in nbh.split("-")])
-                merged_nbh_frequencies[tracked_node][nbh] += freq
-        os.remove(input_file)
-
-    output_file_name = os.path.join(data_dir, "nbh_frequencies.csv")
-    with open(output_file_name, "w") as out_file:
-        out_file.write("algorithm,nodes,k,time_per_run,seed,max_network_delay,tracked_node,nbh,freq\n")
-        for tracked_node, nbhs in merged_nbh_frequencies.items():
-            for nbh, freq in nbhs.items():
-                nbh_str = "-".join(["%d" % nb for nb in nbh])
-                out_file.write("swiftpeer,%d,%d,%g,%d,%s,%d,%s,%d\n" % (args.nodes, args.k, args.time_per_run, args.seed, group, tracked_node, nbh_str, freq))
+    return os.path.join("data", dir_name)
 
-    if not args.basic:
-        # Merge peer lock time
-        merged_lock_times: Dict[int, float] = {}
-        for node in range(args.nodes):
-            merged_lock_times[node] = 0
-
-        input_files = [os.path.join(data_dir, "peer_time_locked_%d.csv" % process_index) for process_index in range(cpus_to_use)]
-        for input_file in input_files:
-            with open(input_file, "r") as in_file:
-                reader = csv.reader(in_file)
-                next(reader)  # Skip the header
-                for row in reader:
-                    node_id, time_locked = int(row[0]), float(row[1])
-                    merged_lock_times[node_id] += time_locked
-            os.remove(input_file)
-
-        for node in range(args.nodes):
-            merged_lock_times[node] /= cpus_to_use
-
-        output_file_name = os.path.join(data_dir, "peer_time_locked.csv")
-        with open(output_file_name, "w") as out_file:
-            out_file.write("algorithm,nodes,k,time_per_run,seed,node,avg_time_locked\n")
-            for node, time_locked in merged_lock_times.items():
-                out_file.write("swiftpeer,%d,%d,%g,%d,%d,%g\n" % (args.nodes, args.k, args.time_per_run, args.seed, node, time_locked))
-
-        # Merge average swap times
-        swap_times: List[float] = []
-        input_files = [os.path.join(data_dir, "avg_swap_times_%d.csv" % process_index) for process_index in range(cpus_to_use)]
-        for input_file in input_files:
-            with open(input_file, "r") as in_file:
-                reader = csv.reader(in_file)
-                next(reader)  # Skip the header
-                for row in reader:
-                    swap_time = float(row[0])
-                    swap_times.append(swap_time)
-            os.remove(input_file)
-
-        output_file_name = os.path.join(data_dir, "avg_swap_times.csv")
-        with open(output_file_name, "w") as out_file:
-            out_file.write("algorithm,nodes,k,time_per_run,seed,max_network_latency,swap_time\n")
-            for swap_time in swap_times:
-                group = "traces" if args.latencies_file else "0-%d ms" % int(args.max_network_latency * 1000)
-                out_file.write("swiftpeer,%d,%d,%g,%d,%s,%g\n" % (args.nodes, args.k, args.time_per_run, args.seed, group, swap_time))
+
+def is_complete(data_dir: str) -> bool:
+    """
+    Whether an experiment has written all its results. The checkpoint is only removed after the results are written.
+    """
+    return os.path.exists(os.path.join(data_dir, "frequencies.npz")) and \
+        not os.path.exists(os.path.join(data_dir, "checkpoint.pkl"))
+
+
+class Experiment:
+    """
+    The runs of a single configuration, whose results are stored in its own data directory.
+    """
+
+    def __init__(self, args, cpus: int, data_dir: Optional[str] = None):
+        self.args = args
+        self.data_dir: str = data_dir or get_data_dir(args)
+        if os.path.exists(self.data_dir) and not args.resume:
+            shutil.rmtree(self.data_dir)
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        # Build the graph and latency caches once, before the workers memory-map them
+        load_edges(args.nodes, args.k, args.seed)
+        if args.latencies_file:
+            load_latency_matrix(args.latencies_file)
+
+        # The runs are split into chunks that go to the workers as they become free. The results of every chunk are
+        # folded into the totals as soon as it finishes, which are periodically saved so an interrupted experiment can
+        # be resumed.
+        self.total_runs: int = args.runs_per_process * cpus
+        self.checkpoint_file: str = os.path.join(self.data_dir, "checkpoint.pkl")
+        self.results: Optional[ProcessResults] = ProcessResults.load_checkpoint(self.checkpoint_file) \
+            if args.resume else None
+        if self.results:
+            print("Resuming %s after %d runs" % (self.data_dir, self.results.runs))
+        else:
+            self.results = ProcessResults(get_tracked_nodes(args), args.nodes, args.k)
+        self.checkpointer = Checkpointer(self.checkpoint_file, args.checkpoint_interval)
+        self.monitor: Optional[ConvergenceMonitor] = ConvergenceMonitor(args, self.results.convergence_rows) \
+            if args.target_precision else None
+        # The row of a resumed experiment is already in its checkpoint
+        self.converged: bool = self.monitor is not None and self.results.runs > 0 and \
+            self.monitor.check(self.results.counts, self.results.runs, record=False)
+        self.chunks: List[Tuple[int, int]] = [] if self.converged else \
+            get_chunks(self.results.next_run_index, self.total_runs - self.results.runs,
+                       get_chunk_size(args, self.total_runs, cpus))
+        # Chunks finish out of order or stop early, so the runs after a resume are numbered after all runs handed out
+        # before, which keeps the run indices in metrics.csv unique
+        self.results.next_run_index += max(self.total_runs - self.results.runs, 0)
+        self.written: bool = False
+        self.start_time: float = time.time()
+
+    def __getstate__(self):
+        # Workers only need the configuration of the experiment
+        return {"args": self.args, "data_dir": self.data_dir}
+
+    def add_results(self, chunk_results: ProcessResults):
+        self.results.merge(chunk_results)
+        if self.monitor:
+            self.converged = self.monitor.check(self.results.counts, self.results.runs)
+        self.checkpointer.maybe_save(self.results)
+
+    def is_done(self) -> bool:
+        return self.converged or self.results.runs >= self.total_runs
+
+    def write_results(self):
+        args, data_dir, results = self.args, self.data_dir, self.results
+        self.written = True
+        print("Experiment %s took %f s., swaps done: %d, failed swaps: %d" %
+              (data_dir, time.time() - self.start_time, results.swaps, results.failed_swaps))
+        if self.converged:
+            print("Converged after %d runs" % results.runs)
+
+        # Until all results are written, the experiment is resumed from this checkpoint
+        results.save_checkpoint(self.checkpoint_file)
+
+        counts = results.counts
+        nb_keys, nb_counts = counts.nb_frequencies.get_arrays()
+        nbh_keys, nbh_counts = counts.nbh_frequencies.get_arrays()
+        np.savez(os.path.join(data_dir, "frequencies.npz"), tracked_nodes=counts.tracked_nodes, nb_keys=nb_keys,
+                 nb_counts=nb_counts, nbh_keys=nbh_keys, nbh_counts=nbh_counts,
+                 irregular_nbhs=np.array(["-".join(["%d" % nb for nb in key])
+                                          for key in counts.irregular_nbh_frequencies]),
+                 irregular_nbh_counts=np.array(list(counts.irregular_nbh_frequencies.values()), dtype=np.int64))
+
+        group = "traces" if args.latencies_file else "0-%d ms" % int(args.max_network_latency * 1000)
+        prefix = "swiftpeer,%d,%d,%g,%d,%s," % (args.nodes, args.k, args.time_per_run, args.seed, group)
+        if args.csv_export:
+            write_csv_export(data_dir, prefix, counts)
+
+        if not args.basic:
+            merged_lock_times = results.peer_locked_time / results.runs
+            np.save(os.path.join(data_dir, "peer_time_locked.npy"), merged_lock_times)
+            results.locked_times.save(os.path.join(data_dir, "time_locked.npz"))
+            results.swap_durations.save(os.path.join(data_dir, "swap_times.npz"))
+
+            if args.csv_export:
+                node_prefix = "swiftpeer,%d,%d,%g,%d," % (args.nodes, args.k, args.time_per_run, args.seed)
+                np.savetxt(os.path.join(data_dir, "peer_time_locked.csv"),
+                           np.column_stack((np.arange(args.nodes), merged_lock_times)), fmt=node_prefix + "%d,%g",
+                           header="algorithm,nodes,k,time_per_run,seed,node,avg_time_locked", comments="")
+                # The histograms are exported as the value of every non-empty bin with its count
+                for name, column, histogram in [("time_locked", "time_locked", results.locked_times),
+                                                ("swap_times", "swap_time", results.swap_durations)]:
+                    np.savetxt(os.path.join(data_dir, "%s.csv" % name), np.column_stack(histogram.get_arrays()),
+                               fmt=prefix + "%g,%d", header="algorithm,nodes,k,time_per_run,seed,max_network_latency,"
+                               "%s,count" % column, comments="")
+
+            if args.metrics:
+                with open(os.path.join(data_dir, "metrics.csv"), "w") as out_file:
+                    out_file.write("run,%s\n" % SimulationMetrics.get_csv_header())
+                    out_file.writelines(results.metrics_rows)
+
+        if self.monitor:
+            self.monitor.write(data_dir)
+
+        # All results are written, so the checkpoint is no longer needed
+        os.remove(self.checkpoint_file)
+
+
+def run_experiments(experiments: List[Experiment], cpus: int, init_args):
+    """
+    Run the chunks of all experiments on a single pool of workers, and write the results of every experiment as soon as
+    its last chunk is done or it has converged. The remaining runs of a converged experiment are skipped.
+    """
+    total_runs: int = sum(experiment.total_runs for experiment in experiments)
+    runs_done: int = sum(experiment.results.runs for experiment in experiments)
+    runs_at_start: int = runs_done
+    start_time: float = time.time()
+
+    tasks: List[Tuple[int, Experiment, Tuple[int, int]]] = []
+    for exp_index, experiment in enumerate(experiments):
+        experiment.start_time = start_time
+        tasks += [(exp_index, experiment, chunk) for chunk in experiment.chunks]
+        if not experiment.chunks:
+            experiment.write_results()
+
+    if tasks:
+        stop_flags = multiprocessing.RawArray("b", len(experiments))
+        with multiprocessing.Pool(cpus, initializer=init_worker, initargs=(init_args, stop_flags)) as pool:
+            for exp_index, chunk_results in pool.imap_unordered(run_chunk, tasks):
+                experiment = experiments[exp_index]
+                if experiment.written:
+                    continue  # Runs that were still going when the experiment converged
+
+                experiment.add_results(chunk_results)
+                runs_done += chunk_results.runs
+                if experiment.converged:
+                    stop_flags[exp_index] = 1
+                    total_runs -= experiment.total_runs - experiment.results.runs
+                print_progress(runs_done, total_runs, runs_done - runs_at_start, start_time)
+                if experiment.is_done():
+                    print()
+                    experiment.write_results()
+        print()
+
+
+if __name__ == "__main__":
+    args = get_args()
+    logging.basicConfig(level=getattr(logging, args.log_level))
+
+    # How many CPUs do we have?
+    cpus_to_use = args.cpus or max(1, multiprocessing.cpu_count() - 2)  # Don't be greedy and use all the CPUs :)
+
+    print("Will start experiments on %d CPUs..." % cpus_to_use)
+
+    run_experiments([Experiment(args, cpus_to_use)], cpus_to_use, args)
@@ -0,0 +1,75 @@
+import math
+import os
+from statistics import NormalDist
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from peerswap.results import NeighbourhoodCounts
+
+
+def get_neighbour_distances(counts: NeighbourhoodCounts, metric: str, confidence: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return, for every tracked node, the distance between the frequencies of its neighbours and the uniform distribution
+    over the N - 1 other nodes, and the half-width of a confidence interval around it.
+
+    The total-variation distance is bounded by the expected TV distance between the empirical and the true distribution,
+    at most 0.5 * sqrt(m / S) for m nodes and S observed neighbours, plus a two-sided McDiarmid bound over the runs.
+    The chi-square divergence is estimated without bias as (X^2 - (m - 1)) / S from Pearson's statistic X^2, which has a
+    (noncentral) chi-square distribution with variance 2 * (m - 1) + 4 * S * divergence, and a normal approximation.
+    """
+    num_tracked: int = len(counts.tracked_nodes)
+    m: int = counts.nodes - 1
+    keys, freqs = counts.nb_frequencies.get_arrays()
+    tracked_indices: np.ndarray = keys // counts.nodes
+    observed: np.ndarray = np.bincount(tracked_indices, weights=freqs, minlength=num_tracked)
+    seen: np.ndarray = np.bincount(tracked_indices, minlength=num_tracked)
+    observed_per_key: np.ndarray = np.maximum(observed, 1)[tracked_indices]
+    # Nodes that have never been a neighbour of a tracked node each contribute the same term
+    unseen: np.ndarray = m - seen
+
+    if metric == "tv":
+        deviations: np.ndarray = np.abs(freqs / observed_per_key - 1 / m)
+        distances: np.ndarray = 0.5 * (np.bincount(tracked_indices, weights=deviations, minlength=num_tracked) +
+                                       unseen / m)
+        runs: np.ndarray = np.maximum(observed, 1) / counts.k
+        half_widths: np.ndarray = 0.5 * np.sqrt(m / np.maximum(observed, 1)) + \
+            np.sqrt(math.log(2 / (1 - confidence)) / (2 * runs))
+    else:
+        expected: np.ndarray = np.maximum(observed, 1) / m
+        deviations = (freqs - expected[tracked_indices]) ** 2 / expected[tracked_indices]
+        pearson: np.ndarray = np.bincount(tracked_indices, weights=deviations, minlength=num_tracked) + unseen * expected
+        distances = (pearson - (m - 1)) / np.maximum(observed, 1)
+        z: float = NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+        half_widths = z * np.sqrt(2 * (m - 1) + 4 * np.maximum(pearson - (m - 1), 0)) / np.maximum(observed, 1)
+
+    # Without observations, nothing is known about the distance
+    half_widths[observed == 0] = np.inf
+    return distances, half_widths
+
+
+class ConvergenceMonitor:
+    """
+    Decides when the neighbour frequencies of an experiment are known precisely enough to stop it, which is when the
+    confidence intervals of the distances to the uniform distribution of all tracked nodes are at most
+    --target-precision wide on either side. The rows of convergence.csv are appended to the given list, which is kept
+    in the checkpoint of the experiment.
+    """
+
+    def __init__(self, args, rows: Optional[List[str]] = None):
+        self.metric: str = args.convergence_metric
+        self.confidence: float = args.confidence
+        self.target_precision: float = args.target_precision
+        self.rows: List[str] = rows if rows is not None else []
+
+    def check(self, counts: NeighbourhoodCounts, runs: int, record: bool = True) -> bool:
+        distances, half_widths = get_neighbour_distances(counts, self.metric, self.confidence)
+        max_half_width: float = half_widths.max()
+        if record:
+            self.rows.append("%d,%g,%g,%g\n" % (runs, distances.mean(), distances.max(), max_half_width))
+        return max_half_width <= self.target_precision
+
+    def write(self, data_dir: str):
+        with open(os.path.join(data_dir, "convergence.csv"), "w") as out_file:
+            out_file.write("runs,mean_%s,max_%s,max_half_width\n" % (self.metric, self.metric))
+            out_file.writelines(self.rows)
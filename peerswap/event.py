@@ -1,35 +1,36 @@
 from functools import total_ordering
-from typing import Dict, NamedTuple
+from typing import NamedTuple, Tuple
 
 
-CLOCK_FIRE = "clock_fire"
-LOCK_REQUEST = "lock_request"
-LOCK_RESPONSE = "lock_response"
-UNLOCK = "unlock"
-SWAP = "swap"
-SWAP_FAIL = "swap_fail"
-REPLACE = "replace"
-STOP_CLOCKS = "stop_clocks"
-STOP = "stop"
+# Event types, with the layout of their payload tuples
+CLOCK_FIRE = 0  # (clock,)
+LOCK_REQUEST = 1  # (from, to, edge)
+LOCK_RESPONSE = 2  # (from, to, swap, success, adjacent)
+UNLOCK = 3  # (from, to, swap)
+SWAP = 4  # (from, to, swap, nbs)
+SWAP_FAIL = 5  # (from, to, swap)
+REPLACE = 6  # (from, to, swap, replace)
+STOP_CLOCKS = 7
+STOP = 8
+
+EVENT_NAMES = ["clock_fire", "lock_request", "lock_response", "unlock", "swap", "swap_fail", "replace", "stop_clocks",
+               "stop"]
 
 
 class Event:
-    COUNTER = 0
+    __slots__ = ("time", "type", "data")
 
-    def __init__(self, time: float, type: str, data: Dict = None):
+    def __init__(self, time: float, type: int, data: Tuple = ()):
         self.time: float = time
-        self.index = Event.COUNTER
-        self.type: str = type
-        self.data: Dict = data or {}
-
-        Event.COUNTER += 1
+        self.type: int = type
+        self.data: Tuple = data
 
     def __str__(self):
-        return "Event(%f, %s, %s)" % (self.time, self.type, self.data)
+        return "Event(%f, %s, %s)" % (self.time, EVENT_NAMES[self.type], self.data)
 
 
 @total_ordering
 class BasicEvent(NamedTuple):
     time: float
     from_vertex: int
-    to_vertex: int
\ No newline at end of file
+    to_vertex: int
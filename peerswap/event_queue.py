@@ -0,0 +1,123 @@
+import heapq
+from typing import Any, List, Tuple
+
+
+QueueEntry = Tuple[float, int, Any]
+
+
+class HeapEventQueue:
+    """
+    Binary heap keyed on (time, index). Insertion and removal are O(log n).
+    """
+
+    def __init__(self):
+        self.heap: List[QueueEntry] = []
+
+    def push(self, time: float, index: int, item: Any):
+        heapq.heappush(self.heap, (time, index, item))
+
+    def pop(self) -> QueueEntry:
+        return heapq.heappop(self.heap)
+
+    def clear(self):
+        self.heap.clear()
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class CalendarEventQueue:
+    """
+    Calendar queue (R. Brown, 1988). Events are hashed into buckets that each cover a fixed slice of simulated time,
+    and the queue walks over the buckets like the days in a calendar. Insertion and removal are O(1) on average when
+    the bucket width matches the event density. The number of buckets and their width are adapted whenever the queue
+    grows or shrinks by a factor of two. Since the buckets are walked in Python, it is slower than the C-implemented
+    binary heap at the sizes in scripts/benchmark_event_queue.py, and is kept as an alternative.
+    """
+
+    MIN_BUCKETS = 2
+    WIDTH_SAMPLE_SIZE = 25
+
+    def __init__(self, num_buckets: int = MIN_BUCKETS, bucket_width: float = 1.0):
+        self.size: int = 0
+        self.setup(num_buckets, bucket_width, 0)
+
+    def setup(self, num_buckets: int, bucket_width: float, start_time: float):
+        self.num_buckets: int = num_buckets
+        self.bucket_width: float = bucket_width
+        self.buckets: List[List[QueueEntry]] = [[] for _ in range(num_buckets)]
+        self.last_time: float = start_time
+        virtual_bucket: int = int(start_time / bucket_width)
+        self.current_bucket: int = virtual_bucket % num_buckets
+        self.bucket_top: float = (virtual_bucket + 1) * bucket_width
+
+    def push(self, time: float, index: int, item: Any):
+        heapq.heappush(self.buckets[int(time / self.bucket_width) % self.num_buckets], (time, index, item))
+        self.size += 1
+        if self.size > 2 * self.num_buckets:
+            self.resize(2 * self.num_buckets)
+
+    def pop(self) -> QueueEntry:
+        if not self.size:
+            raise IndexError("pop from an empty event queue")
+
+        buckets = self.buckets
+        bucket_ind: int = self.current_bucket
+        bucket_top: float = self.bucket_top
+        for _ in range(self.num_buckets):
+            bucket = buckets[bucket_ind]
+            if bucket and bucket[0][0] < bucket_top:
+                return self.take(bucket_ind, bucket_top)
+            bucket_ind += 1
+            bucket_top += self.bucket_width
+            if bucket_ind == self.num_buckets:
+                bucket_ind = 0
+
+        # The next event is more than a full calendar year away - look it up directly
+        bucket_ind = min((ind for ind in range(self.num_buckets) if buckets[ind]), key=lambda ind: buckets[ind][0])
+        bucket_top = (int(buckets[bucket_ind][0][0] / self.bucket_width) + 1) * self.bucket_width
+        return self.take(bucket_ind, bucket_top)
+
+    def take(self, bucket_ind: int, bucket_top: float) -> QueueEntry:
+        entry: QueueEntry = heapq.heappop(self.buckets[bucket_ind])
+        self.current_bucket = bucket_ind
+        self.bucket_top = bucket_top
+        self.last_time = entry[0]
+        self.size -= 1
+        if self.num_buckets > self.MIN_BUCKETS and self.size < self.num_buckets // 2:
+            self.resize(self.num_buckets // 2)
+        return entry
+
+    def estimate_bucket_width(self, entries: List[QueueEntry]) -> float:
+        """
+        Use three times the average separation between the first events in the queue as new bucket width.
+        """
+        sample: List[QueueEntry] = heapq.nsmallest(self.WIDTH_SAMPLE_SIZE, entries)
+        if len(sample) < 2 or sample[-1][0] == sample[0][0]:
+            return self.bucket_width
+        return 3 * (sample[-1][0] - sample[0][0]) / (len(sample) - 1)
+
+    def resize(self, num_buckets: int):
+        entries: List[QueueEntry] = [entry for bucket in self.buckets for entry in bucket]
+        self.setup(num_buckets, self.estimate_bucket_width(entries), self.last_time)
+        for entry in entries:
+            heapq.heappush(self.buckets[int(entry[0] / self.bucket_width) % self.num_buckets], entry)
+
+    def clear(self):
+        self.size = 0
+        self.setup(self.MIN_BUCKETS, self.bucket_width, 0)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+EVENT_QUEUES = {
+    "heap": HeapEventQueue,
+    "calendar": CalendarEventQueue,
+}
+
+
+def create_event_queue(name: str):
+    if name not in EVENT_QUEUES:
+        raise RuntimeError("Unknown event queue %s" % name)
+    return EVENT_QUEUES[name]()
@@ -0,0 +1,45 @@
+import logging
+import os
+
+import numpy as np
+from networkx import random_regular_graph
+
+# Generated graphs are shared by all experiments and scripts, regardless of the directory they are started from
+GRAPH_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "graphs")
+
+
+def get_edge_array(G) -> np.ndarray:
+    return np.array(G.edges, dtype=np.int32).reshape(-1, 2)
+
+
+def get_nb_vertices(edges: np.ndarray, nodes: int) -> np.ndarray:
+    """
+    Return an N x k array in which row v holds the neighbouring vertices of vertex v.
+    """
+    directed_edges: np.ndarray = np.concatenate([edges, edges[:, ::-1]])
+    order: np.ndarray = np.argsort(directed_edges[:, 0], kind="stable")
+    return directed_edges[order, 1].reshape(nodes, -1)
+
+
+def get_graph_cache_file(nodes: int, k: int, seed: int) -> str:
+    return os.path.join(GRAPH_CACHE_DIR, "n_%d_k_%d_s_%d.npy" % (nodes, k, seed))
+
+
+def load_edges(nodes: int, k: int, seed: int) -> np.ndarray:
+    """
+    Return the (E, 2) edge array of the random k-regular graph with the given seed, in the order of networkx. Generated
+    graphs are cached in a .npy file, which is memory-mapped, so all processes on a machine share a single copy.
+    """
+    cache_file: str = get_graph_cache_file(nodes, k, seed)
+    if not os.path.exists(cache_file):
+        logging.info("Building graph cache %s" % cache_file)
+        edges: np.ndarray = get_edge_array(random_regular_graph(k, nodes, seed=seed))
+
+        # Write to a temporary file first so concurrent readers never see a partial cache
+        os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+        tmp_file: str = "%s.%d.tmp" % (cache_file, os.getpid())
+        with open(tmp_file, "wb") as out_file:
+            np.save(out_file, edges)
+        os.replace(tmp_file, cache_file)
+
+    return np.load(cache_file, mmap_mode="r")
@@ -0,0 +1,100 @@
+import math
+from typing import Iterable, Tuple
+
+import numpy as np
+
+# Every value is represented by a value within this relative distance of it
+RELATIVE_ACCURACY = 0.01
+
+# Values up to MIN_VALUE are counted as zero, and values above MAX_VALUE in the last bin
+MIN_VALUE = 1e-6
+MAX_VALUE = 1e6
+
+
+class Histogram:
+    """
+    A histogram of non-negative values with logarithmically spaced bins, which answers quantiles with a relative error
+    of at most RELATIVE_ACCURACY. The bins are the same for every histogram, so it uses a fixed amount of memory no
+    matter how many values are added, and histograms of different processes are merged by adding their counts.
+    """
+
+    def __init__(self):
+        self.gamma: float = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+        self.log_gamma: float = math.log(self.gamma)
+        # Bin i > 0 holds the values in (gamma^(i + offset - 1), gamma^(i + offset)], and bin 0 holds the zeros
+        self.offset: int = math.floor(math.log(MIN_VALUE) / self.log_gamma)
+        self.counts: np.ndarray = np.zeros(math.ceil(math.log(MAX_VALUE) / self.log_gamma) - self.offset + 1,
+                                           dtype=np.int64)
+        self.count: int = 0
+        self.total: float = 0
+        self.min: float = math.inf
+        self.max: float = 0
+
+    def get_bin(self, value: float) -> int:
+        if value <= MIN_VALUE:
+            return 0
+        return min(math.ceil(math.log(value) / self.log_gamma) - self.offset, len(self.counts) - 1)
+
+    def add_value(self, value: float):
+        self.counts[self.get_bin(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add(self, values: Iterable[float]):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        bins: np.ndarray = np.ceil(np.log(np.maximum(values, MIN_VALUE)) / self.log_gamma) - self.offset
+        bins[values <= MIN_VALUE] = 0
+        self.counts += np.bincount(np.minimum(bins, len(self.counts) - 1).astype(np.int64), minlength=len(self.counts))
+        self.count += len(values)
+        self.total += values.sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def merge(self, other: "Histogram"):
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def clear(self):
+        self.counts.fill(0)
+        self.count = 0
+        self.total = 0
+        self.min = math.inf
+        self.max = 0
+
+    def get_bin_values(self) -> np.ndarray:
+        """
+        Return the value that represents each bin, which is within RELATIVE_ACCURACY of every value in the bin.
+        """
+        values: np.ndarray = 2 * self.gamma ** (np.arange(len(self.counts)) + self.offset) / (self.gamma + 1)
+        values[0] = 0
+        return values
+
+    def get_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the values and counts of the non-empty bins, in increasing order of value.
+        """
+        bins: np.ndarray = np.flatnonzero(self.counts)
+        return self.get_bin_values()[bins], self.counts[bins]
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return math.nan
+        rank: int = min(int(q * self.count), self.count - 1)
+        value: float = self.get_bin_values()[np.searchsorted(np.cumsum(self.counts), rank, side="right")]
+        # The exact extremes are known, so estimates never fall outside them
+        return min(max(value, self.min), self.max)
+
+    def save(self, file_name: str):
+        values, counts = self.get_arrays()
+        np.savez(file_name, values=values, counts=counts, count=self.count, total=self.total, min=self.min,
+                 max=self.max)
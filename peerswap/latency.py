@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import os
+import random
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# Beyond this network size, an N x N latency matrix takes more than 1 GiB and latencies are drawn lazily instead
+MAX_DENSE_LATENCY_NODES = 16384
+
+
+class RandomLatencyModel:
+    """
+    Draws a latency uniformly between 0 and a maximum for every ordered pair of peers. The latencies are stored in a
+    single float32 matrix that can be redrawn in place between runs.
+    """
+
+    def __init__(self, nodes: int, max_latency: float):
+        self.nodes: int = nodes
+        self.max_latency: float = max_latency
+        self.latencies: np.ndarray = np.empty((nodes, nodes), dtype=np.float32)
+        self.rng: np.random.Generator = np.random.default_rng()
+        self.redraw()
+
+    def redraw(self):
+        logging.getLogger(self.__class__.__name__).info("Generating random latencies")
+        self.rng.random(out=self.latencies, dtype=np.float32)
+        self.latencies *= self.max_latency
+        np.fill_diagonal(self.latencies, 0)
+
+    def get_latency(self, from_peer: int, to_peer: int) -> float:
+        return self.latencies.item(from_peer, to_peer)
+
+
+class LazyRandomLatencyModel:
+    """
+    Same distribution as the RandomLatencyModel, but a latency is only drawn when a pair of peers first communicates.
+    Peers only talk to their (current) neighbours, so this uses far less memory than an N x N matrix in large networks.
+    """
+
+    def __init__(self, max_latency: float):
+        self.max_latency: float = max_latency
+        self.latencies: Dict[Tuple[int, int], float] = {}
+        self.rng: random.Random = random.Random()
+
+    def redraw(self):
+        self.latencies.clear()
+
+    def get_latency(self, from_peer: int, to_peer: int) -> float:
+        if from_peer == to_peer:
+            return 0
+        latency: Optional[float] = self.latencies.get((from_peer, to_peer))
+        if latency is None:
+            latency = self.rng.random() * self.max_latency
+            self.latencies[(from_peer, to_peer)] = latency
+        return latency
+
+
+class TraceLatencyModel:
+    """
+    Latencies between the sites of a latency matrix (in milliseconds). Peers are assigned to sites in a round-robin
+    fashion after shuffling them with the experiment seed.
+    """
+
+    def __init__(self, latencies_file: str, nodes: int, seed: int):
+        self.site_latencies: np.ndarray = load_latency_matrix(latencies_file)
+        self.num_sites: int = self.site_latencies.shape[0]
+
+        node_to_latency = list(range(nodes))
+        random.Random(seed).shuffle(node_to_latency)
+        self.node_to_site: np.ndarray = np.array(node_to_latency, dtype=np.int32) % self.num_sites
+
+        logging.getLogger(self.__class__.__name__).info("Read latency matrix with %d sites! Avg latency: %f, max: %f" % (
+            self.num_sites, self.site_latencies.mean(), self.site_latencies.max()))
+
+    def redraw(self):
+        pass  # The traces are fixed
+
+    def get_latency(self, from_peer: int, to_peer: int) -> float:
+        return self.site_latencies.item(self.node_to_site[from_peer], self.node_to_site[to_peer])
+
+
+def get_latency_cache_file(latencies_file: str) -> str:
+    """
+    The cache file is named after a hash of the contents of the CSV file, so a changed file never matches an old cache,
+    whatever its modification time.
+    """
+    digest = hashlib.sha1()
+    with open(latencies_file, "rb") as in_file:
+        for block in iter(lambda: in_file.read(1 << 20), b""):
+            digest.update(block)
+    return "%s.%s.npy" % (os.path.splitext(latencies_file)[0], digest.hexdigest()[:16])
+
+
+def load_latency_matrix(latencies_file: str) -> np.ndarray:
+    """
+    Load a latency matrix in milliseconds and return it in seconds. The parsed matrix is cached in a .npy file next to
+    the CSV file, keyed by its contents. The cache is memory-mapped, so all processes on a machine share a single copy
+    of the matrix.
+    """
+    cache_file: str = get_latency_cache_file(latencies_file)
+    if not os.path.exists(cache_file):
+        logging.info("Building latency cache %s" % cache_file)
+        latencies: np.ndarray = np.loadtxt(latencies_file, delimiter=",", dtype=np.float32, ndmin=2)
+        latencies = np.maximum(latencies / 1000, 0)
+
+        # Write to a temporary file first so concurrent readers never see a partial cache
+        tmp_file: str = "%s.%d.tmp" % (cache_file, os.getpid())
+        with open(tmp_file, "wb") as out_file:
+            np.save(out_file, latencies)
+        os.replace(tmp_file, cache_file)
+
+    return np.load(cache_file, mmap_mode="r")
+
+
+def create_latency_model(args):
+    if args.latencies_file:
+        return TraceLatencyModel(args.latencies_file, args.nodes, args.seed)
+    if args.nodes > MAX_DENSE_LATENCY_NODES:
+        return LazyRandomLatencyModel(args.max_network_latency)
+    return RandomLatencyModel(args.nodes, args.max_network_latency)
@@ -0,0 +1,46 @@
+from typing import Dict, List
+
+from peerswap.event import EVENT_NAMES
+
+# Reasons why a swap does not go through. Adjacent neighbours refuse to lock but do not abort the swap, and a clock fire
+# is skipped without counting as failed swap when one of the endpoints is already locked.
+FAILURE_REASONS = ["adjacent", "already_locked", "not_a_neighbour", "duplicate_clock_fire", "endpoint_locked"]
+
+
+class SimulationMetrics:
+    """
+    Hot-path counters of a single run of the lock-based simulator, only collected when metrics are enabled.
+    """
+
+    def __init__(self):
+        self.event_counts: List[int] = [0] * len(EVENT_NAMES)
+        self.event_cpu_time: List[float] = [0] * len(EVENT_NAMES)
+        self.failures: Dict[str, int] = {reason: 0 for reason in FAILURE_REASONS}
+        self.peak_queue_depth: int = 0
+        self.total_queue_depth: int = 0
+
+    def record_event(self, event_type: int, queue_depth: int, cpu_time: float):
+        self.event_counts[event_type] += 1
+        self.event_cpu_time[event_type] += cpu_time
+        self.total_queue_depth += queue_depth
+        if queue_depth > self.peak_queue_depth:
+            self.peak_queue_depth = queue_depth
+
+    def get_mean_queue_depth(self) -> float:
+        events: int = sum(self.event_counts)
+        return self.total_queue_depth / events if events else 0
+
+    @staticmethod
+    def get_csv_header() -> str:
+        columns: List[str] = ["events_%s" % name for name in EVENT_NAMES]
+        columns += ["cpu_time_%s" % name for name in EVENT_NAMES]
+        columns += ["failures_%s" % reason for reason in FAILURE_REASONS]
+        columns += ["peak_queue_depth", "mean_queue_depth"]
+        return ",".join(columns)
+
+    def to_csv_row(self) -> str:
+        values: List[str] = ["%d" % count for count in self.event_counts]
+        values += ["%g" % cpu_time for cpu_time in self.event_cpu_time]
+        values += ["%d" % self.failures[reason] for reason in FAILURE_REASONS]
+        values += ["%d" % self.peak_queue_depth, "%g" % self.get_mean_queue_depth()]
+        return ",".join(values)
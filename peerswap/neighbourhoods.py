@@ -0,0 +1,70 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+INT64_MAX = np.iinfo(np.int64).max
+
+
+class NeighbourhoodEncoder:
+    """
+    Encodes sorted neighbourhoods of k nodes as int64 indices in the combinatorial number system (combinadic).
+    When the node a neighbourhood belongs to is given, it is left out of the universe, so the codes of a node range over
+    the C(N - 1, k) neighbourhoods it can have.
+    """
+
+    def __init__(self, nodes: int, k: int):
+        self.nodes: int = nodes
+        self.k: int = k
+        self.num_neighbourhoods: int = math.comb(nodes - 1, k)
+        self._binomials: Optional[np.ndarray] = None
+
+    def __getstate__(self):
+        # The table of binomials is large for big networks and quickly rebuilt, so it is not pickled with the results
+        state = self.__dict__.copy()
+        state["_binomials"] = None
+        return state
+
+    @property
+    def binomials(self) -> np.ndarray:
+        """
+        binomials[c, i] = C(c, i), capped at the largest int64 for the (unused) entries that do not fit. The table is
+        built when it is first used.
+        """
+        if self._binomials is None:
+            self._binomials = np.zeros((self.nodes, self.k + 1), dtype=np.int64)
+            self._binomials[:, 0] = 1
+            for i in range(1, self.k + 1):
+                column = [math.comb(c, i) for c in range(self.nodes)]
+                self._binomials[:, i] = [min(value, INT64_MAX) for value in column]
+        return self._binomials
+
+    def fits(self, num_codes: int = 1) -> bool:
+        """
+        Whether num_codes consecutive ranges of neighbourhood codes fit in an int64.
+        """
+        return num_codes * self.num_neighbourhoods <= INT64_MAX
+
+    def encode(self, nbhs: np.ndarray, nodes: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Encode an M x k array with sorted neighbourhoods, optionally of the given M nodes.
+        """
+        nbhs = np.asarray(nbhs, dtype=np.int64)
+        if nodes is not None:
+            nbhs = nbhs - (nbhs > np.asarray(nodes)[:, None])
+        return self.binomials[nbhs, np.arange(1, self.k + 1)].sum(axis=1)
+
+    def decode(self, codes: np.ndarray, nodes: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Decode neighbourhood codes, optionally of the given nodes, back into an M x k array with sorted neighbourhoods.
+        """
+        remaining: np.ndarray = np.array(codes, dtype=np.int64)
+        nbhs: np.ndarray = np.empty((len(remaining), self.k), dtype=np.int64)
+        for i in range(self.k, 0, -1):
+            # Find the largest c with C(c, i) <= the remaining code
+            nbhs[:, i - 1] = np.searchsorted(self.binomials[:, i], remaining, side="right") - 1
+            remaining -= self.binomials[nbhs[:, i - 1], i]
+
+        if nodes is not None:
+            nbhs += nbhs >= np.asarray(nodes)[:, None]
+        return nbhs
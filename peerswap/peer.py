@@ -1,7 +1,10 @@
-from typing import Set, Optional, List, Tuple
+from typing import Set, Optional, List, Tuple, Iterable
 
 
 class Peer:
+    __slots__ = ("index", "nbs", "locked_for_swap", "locked_at_time", "total_time_locked", "ongoing_swap", "other_nbs",
+                 "adjacent_nbs", "ready_for_swap", "other_ready_for_swap", "lock_responses_sent",
+                 "lock_responses_received")
 
     def __init__(self, index: int, nbs: Set[int]):
         self.index = index
@@ -18,6 +21,17 @@ class Peer:
         self.lock_responses_sent: List[int] = []
         self.lock_responses_received: int = 0
 
+    def reset(self, nbs: Iterable[int]):
+        """
+        Restore the initial state of this peer in place, so peers can be reused across runs.
+        """
+        self.nbs.clear()
+        self.nbs.update(nbs)
+        self.locked_for_swap = None
+        self.locked_at_time = None
+        self.total_time_locked = 0
+        self.reset_from_swap()
+
     def is_locked(self) -> bool:
         return self.locked_for_swap is not None
 
@@ -38,9 +52,9 @@ class Peer:
         self.other_nbs = None
         self.ready_for_swap = False
         self.other_ready_for_swap = False
-        self.lock_responses_sent = []
+        self.lock_responses_sent.clear()
         self.lock_responses_received = 0
-        self.adjacent_nbs = set()
+        self.adjacent_nbs.clear()
 
     def get_edge_nb(self) -> Optional[int]:
         if not self.ongoing_swap:
@@ -0,0 +1,267 @@
+import os
+import pickle
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from peerswap.histogram import Histogram
+from peerswap.neighbourhoods import NeighbourhoodEncoder
+
+# Minimum number of new keys after which all keys are reduced to unique keys with counts. The threshold grows with the
+# number of unique keys, so the total cost of compacting stays linear in the number of runs.
+COMPACT_THRESHOLD = 1000000
+
+# Counts are kept in a dense array when there are at most this many possible keys
+MAX_DENSE_KEYS = 1 << 22
+
+
+class KeyCounts:
+    """
+    Counts how often each key is seen. Keys are int64 values below num_keys, which are counted in a dense array when
+    there are few possible keys, or integer rows when num_keys is None. Otherwise, keys are kept as a sparse COO-style
+    accumulator that is periodically reduced to sorted unique keys with counts.
+    """
+
+    def __init__(self, num_keys: Optional[int]):
+        dense: bool = num_keys is not None and num_keys <= MAX_DENSE_KEYS
+        self.dense_counts: Optional[np.ndarray] = np.zeros(num_keys, dtype=np.int64) if dense else None
+        self.pending_keys: List[np.ndarray] = []
+        self.pending_counts: List[np.ndarray] = []
+        self.num_pending_keys: int = 0
+        self.num_compacted_keys: int = 0
+
+    def add(self, keys: np.ndarray, counts: Optional[np.ndarray] = None):
+        if counts is None:
+            counts = np.ones(len(keys), dtype=np.int64)
+        if self.dense_counts is not None:
+            np.add.at(self.dense_counts, keys, counts)
+            return
+
+        self.pending_keys.append(keys)
+        self.pending_counts.append(counts)
+        self.num_pending_keys += len(keys)
+        if self.num_pending_keys - self.num_compacted_keys > max(COMPACT_THRESHOLD, self.num_compacted_keys):
+            self.compact()
+
+    def merge(self, other: "KeyCounts"):
+        if self.dense_counts is not None:
+            self.dense_counts += other.dense_counts
+            return
+
+        keys, counts = other.get_arrays()
+        if self.num_pending_keys == 0:
+            # The keys of the other instance are already unique
+            self.pending_keys, self.pending_counts = [keys], [counts]
+            self.num_pending_keys = self.num_compacted_keys = len(keys)
+        else:
+            self.add(keys, counts)
+
+    def compact(self):
+        if self.dense_counts is not None:
+            return
+
+        keys, counts = self.get_arrays()
+        self.pending_keys = [keys]
+        self.pending_counts = [counts]
+        self.num_pending_keys = len(keys)
+        self.num_compacted_keys = len(keys)
+
+    def get_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the unique keys that have been seen, sorted, and their counts.
+        """
+        if self.dense_counts is not None:
+            keys: np.ndarray = np.flatnonzero(self.dense_counts)
+            return keys, self.dense_counts[keys]
+        if self.num_pending_keys == self.num_compacted_keys and self.pending_keys:
+            return self.pending_keys[0], self.pending_counts[0]
+        return merge_key_counts(self.pending_keys, self.pending_counts)
+
+
+class NeighbourhoodCounts:
+    """
+    Accumulates how often each node and each neighbourhood is seen around the tracked nodes, in binary form.
+    Node frequencies are keyed by the index of the tracked node times N, plus the node. Each neighbourhood is identified
+    by an int64 key: the index of the tracked node times the number of possible neighbourhoods, plus the combinadic code
+    of the neighbourhood. If these keys do not fit in an int64, neighbourhoods are kept as rows of the tracked node
+    followed by its sorted neighbours instead. The rare neighbourhoods that do not have k nodes, as a run of the
+    lock-based simulator can end during a swap, are counted separately in a dict.
+    """
+
+    def __init__(self, tracked_nodes: np.ndarray, nodes: int, k: int):
+        self.tracked_nodes: np.ndarray = np.asarray(tracked_nodes, dtype=np.int64)
+        self.tracked_index: Dict[int, int] = {node: ind for ind, node in enumerate(self.tracked_nodes.tolist())}
+        self.nodes: int = nodes
+        self.k: int = k
+        self.nb_frequencies: KeyCounts = KeyCounts(len(self.tracked_nodes) * nodes)
+
+        self.encoder: NeighbourhoodEncoder = NeighbourhoodEncoder(nodes, k)
+        self.use_codes: bool = self.encoder.fits(len(self.tracked_nodes))
+        self.nbh_frequencies: KeyCounts = KeyCounts(len(self.tracked_nodes) * self.encoder.num_neighbourhoods
+                                                    if self.use_codes else None)
+        self.irregular_nbh_frequencies: Dict[Tuple[int, ...], int] = {}
+
+    def get_keys(self, tracked_indices: np.ndarray, nbhs: np.ndarray) -> np.ndarray:
+        """
+        Return the keys of M sorted neighbourhoods (an M x k array) of the tracked nodes with the given indices.
+        """
+        if self.use_codes:
+            codes: np.ndarray = self.encoder.encode(nbhs, self.tracked_nodes[tracked_indices])
+            return tracked_indices * self.encoder.num_neighbourhoods + codes
+        return np.column_stack((self.tracked_nodes[tracked_indices], nbhs))
+
+    def decode(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the tracked nodes and the M x k array with sorted neighbourhoods of the given keys.
+        """
+        if not self.use_codes:
+            return keys[:, 0], keys[:, 1:]
+        tracked_indices, codes = np.divmod(keys, self.encoder.num_neighbourhoods)
+        tracked_nodes: np.ndarray = self.tracked_nodes[tracked_indices]
+        return tracked_nodes, self.encoder.decode(codes, tracked_nodes)
+
+    def add_neighbourhoods(self, nbhs: Dict[int, Tuple[int]]):
+        """
+        Count the neighbourhoods of the tracked nodes at the end of a single run.
+        """
+        tracked_nodes: List[int] = []
+        nbh_list: List[Tuple[int]] = []
+        for node, nbh in nbhs.items():
+            if len(nbh) == self.k:
+                tracked_nodes.append(node)
+                nbh_list.append(nbh)
+                continue
+
+            key: Tuple[int, ...] = (node,) + nbh
+            self.irregular_nbh_frequencies[key] = self.irregular_nbh_frequencies.get(key, 0) + 1
+            self.nb_frequencies.add(self.tracked_index[node] * self.nodes + np.array(nbh, dtype=np.int64))
+
+        if not nbh_list:
+            return
+        tracked_indices: np.ndarray = np.array([self.tracked_index[node] for node in tracked_nodes], dtype=np.int64)
+        nbh_array: np.ndarray = np.array(nbh_list, dtype=np.int64)
+        self.nb_frequencies.add((tracked_indices[:, None] * self.nodes + nbh_array).ravel())
+        self.nbh_frequencies.add(self.get_keys(tracked_indices, nbh_array))
+
+    def add_neighbourhood_batch(self, nbhs: np.ndarray):
+        """
+        Count an R x T x k array with the sorted neighbourhoods of all tracked nodes in R runs.
+        """
+        runs, tracked, k = nbhs.shape
+        tracked_indices: np.ndarray = np.tile(np.arange(tracked, dtype=np.int64), runs)
+        nbh_array: np.ndarray = nbhs.reshape(-1, k).astype(np.int64)
+        self.nb_frequencies.add((tracked_indices[:, None] * self.nodes + nbh_array).ravel())
+        self.nbh_frequencies.add(self.get_keys(tracked_indices, nbh_array))
+
+    def merge(self, other: "NeighbourhoodCounts"):
+        """
+        Add the counts of another instance, with the same tracked nodes, to this one.
+        """
+        self.nb_frequencies.merge(other.nb_frequencies)
+        self.nbh_frequencies.merge(other.nbh_frequencies)
+        for key, freq in other.irregular_nbh_frequencies.items():
+            self.irregular_nbh_frequencies[key] = self.irregular_nbh_frequencies.get(key, 0) + freq
+
+    def compact(self):
+        self.nb_frequencies.compact()
+        self.nbh_frequencies.compact()
+
+
+def merge_key_counts(keys: List[np.ndarray], counts: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge lists of key arrays and their counts into unique, sorted keys with summed counts. Keys are either int64 values
+    or rows of integers.
+    """
+    if not keys:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    all_keys: np.ndarray = np.concatenate(keys)
+    all_counts: np.ndarray = np.concatenate(counts)
+    if all_keys.ndim == 1:
+        unique_keys, inverse = np.unique(all_keys, return_inverse=True)
+        return unique_keys, np.bincount(inverse, weights=all_counts, minlength=len(unique_keys)).astype(np.int64)
+
+    radix: int = int(all_keys.max()) + 1 if len(all_keys) else 1
+    if radix ** all_keys.shape[1] > np.iinfo(np.int64).max:
+        # Rows do not fit in a single integer key, fall back to the (much slower) row-wise unique
+        unique_rows, inverse = np.unique(all_keys, axis=0, return_inverse=True)
+        merged_counts: np.ndarray = np.zeros(len(unique_rows), dtype=np.int64)
+        np.add.at(merged_counts, inverse.ravel(), all_counts)
+        return unique_rows, merged_counts
+
+    # Sort the rows by their mixed-radix key, which orders them lexicographically
+    row_keys: np.ndarray = np.zeros(len(all_keys), dtype=np.int64)
+    for column in range(all_keys.shape[1]):
+        row_keys = row_keys * radix + all_keys[:, column]
+    unique_row_keys, inverse = np.unique(row_keys, return_inverse=True)
+    merged_counts = np.bincount(inverse, weights=all_counts, minlength=len(unique_row_keys)).astype(np.int64)
+
+    unique_rows = np.empty((len(unique_row_keys), all_keys.shape[1]), dtype=np.int64)
+    for column in reversed(range(all_keys.shape[1])):
+        unique_row_keys, unique_rows[:, column] = np.divmod(unique_row_keys, radix)
+    return unique_rows, merged_counts
+
+
+class ProcessResults:
+    """
+    The results of all runs done by a single process, which are returned to the parent process and merged there.
+    """
+
+    def __init__(self, tracked_nodes: np.ndarray, nodes: int, k: int):
+        self.runs: int = 0
+        self.swaps: int = 0
+        self.failed_swaps: int = 0
+        self.counts: NeighbourhoodCounts = NeighbourhoodCounts(tracked_nodes, nodes, k)
+        self.peer_locked_time: np.ndarray = np.zeros(nodes)
+        # The time locked of every peer in every run
+        self.locked_times: Histogram = Histogram()
+        self.swap_durations: Histogram = Histogram()
+        self.metrics_rows: List[str] = []
+        # The index of the first run that has not been handed out to a worker yet
+        self.next_run_index: int = 0
+        # The rows of convergence.csv so far, with --target-precision
+        self.convergence_rows: List[str] = []
+
+    def merge(self, other: "ProcessResults"):
+        self.runs += other.runs
+        self.swaps += other.swaps
+        self.failed_swaps += other.failed_swaps
+        self.counts.merge(other.counts)
+        self.peer_locked_time += other.peer_locked_time
+        self.locked_times.merge(other.locked_times)
+        self.swap_durations.merge(other.swap_durations)
+        self.metrics_rows += other.metrics_rows
+
+    def save_checkpoint(self, file_name: str):
+        """
+        Atomically replace the checkpoint in the given file with these results.
+        """
+        self.counts.compact()
+        tmp_file: str = "%s.%d.tmp" % (file_name, os.getpid())
+        with open(tmp_file, "wb") as out_file:
+            pickle.dump(self, out_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, file_name)
+
+    @staticmethod
+    def load_checkpoint(file_name: str) -> Optional["ProcessResults"]:
+        if not os.path.exists(file_name):
+            return None
+        with open(file_name, "rb") as in_file:
+            return pickle.load(in_file)
+
+
+class Checkpointer:
+    """
+    Periodically saves the results of a process, at most once per interval (in seconds), so they can be resumed.
+    """
+
+    def __init__(self, file_name: str, interval: float):
+        self.file_name: str = file_name
+        self.interval: float = interval
+        self.last_checkpoint: float = time.time()
+
+    def maybe_save(self, results: ProcessResults):
+        if self.interval and time.time() - self.last_checkpoint >= self.interval:
+            results.save_checkpoint(self.file_name)
+            self.last_checkpoint = time.time()
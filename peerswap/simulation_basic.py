@@ -1,32 +1,46 @@
 import heapq
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 import numpy as np
-from networkx import random_regular_graph
 
 from peerswap.event import BasicEvent
+from peerswap.graphs import get_edge_array, get_nb_vertices, load_edges
+from peerswap.tracking import get_tracked_nodes
 
 
 class Simulation:
 
-    def __init__(self, args, G = None):
+    def __init__(self, args, G = None, edges: Optional[np.ndarray] = None):
         self.args = args
         self.current_time: float = 0
         self.events: List[Tuple[float, BasicEvent]] = []
         self.swaps: int = 0
         self.nb_frequencies: List[int] = [0] * self.args.nodes
-        self.node_to_track: int = 0
+        self.tracked_nodes: List[int] = get_tracked_nodes(self.args).tolist()
         heapq.heapify(self.events)
 
-        self.vertex_to_node_map: Dict[int, int] = {}
-        self.node_to_vertex_map: Dict[int, int] = {}
-        for i in range(self.args.nodes):
-            self.vertex_to_node_map[i] = i
-            self.node_to_vertex_map[i] = i
-
-        self.G = G or random_regular_graph(self.args.k, self.args.nodes, seed=self.args.seed)
-
-        np.random.seed()  # Make sure our runs are random
+        self.initial_map: Dict[int, int] = {i: i for i in range(self.args.nodes)}
+        self.vertex_to_node_map: Dict[int, int] = dict(self.initial_map)
+        self.node_to_vertex_map: Dict[int, int] = dict(self.initial_map)
+
+        if edges is None:
+            edges = get_edge_array(G) if G else load_edges(self.args.nodes, self.args.k, self.args.seed)
+        self.edges: List[Tuple[int, int]] = [tuple(edge) for edge in edges.tolist()]
+        self.nb_vertices: List[List[int]] = get_nb_vertices(edges, self.args.nodes).tolist()
+
+        self.reset()
+
+    def reset(self, seed: Optional[int] = None):
+        """
+        Restore the initial state in place, so a single instance can be reused for many runs. Without a seed, the next
+        run is random.
+        """
+        self.current_time = 0
+        self.events.clear()
+        self.swaps = 0
+        self.vertex_to_node_map.update(self.initial_map)
+        self.node_to_vertex_map.update(self.initial_map)
+        np.random.seed(seed)
 
     def generate_inter_arrival_times(self):
         return np.random.exponential(scale=1 / self.args.poisson_rate)
@@ -35,13 +49,10 @@ class Simulation:
         heapq.heappush(self.events, (event.time, event))
 
     def get_neighbour_of_tracked_nodes(self):
-        if not self.args.track_all_nodes:
-            return {0: tuple(sorted([self.vertex_to_node_map[nb_vertex] for nb_vertex in list(self.G.neighbors(self.node_to_vertex_map[self.node_to_track]))]))}
-        else:
-            res = {}
-            for node in range(self.args.nodes):
-                res[node] = tuple(sorted([self.vertex_to_node_map[nb_vertex] for nb_vertex in list(self.G.neighbors(self.node_to_vertex_map[node]))]))
-            return res
+        res = {}
+        for node in self.tracked_nodes:
+            res[node] = tuple(sorted([self.vertex_to_node_map[nb_vertex] for nb_vertex in self.nb_vertices[self.node_to_vertex_map[node]]]))
+        return res
 
     def process_event(self, event: BasicEvent):
         #print("[t=%.2f] Activating edge (%d - %d)" % (self.current_time, event.from_vertex, event.to_vertex))
@@ -62,7 +73,7 @@ class Simulation:
 
     def run(self):
         # Create the initial events in the queue, for each edge
-        for edge in self.G.edges:
+        for edge in self.edges:
             delay = self.generate_inter_arrival_times()
             event = BasicEvent(delay, *edge)
             self.schedule(event)
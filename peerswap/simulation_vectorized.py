@@ -0,0 +1,263 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from peerswap.graphs import get_edge_array, get_nb_vertices, load_edges
+from peerswap.tracking import get_tracked_nodes
+
+
+class VectorizedSimulation:
+    """
+    Basic-mode simulator that relies on the superposition of the Poisson clocks on the edges. Together, these clocks
+    form a single Poisson process with rate |E| * poisson_rate in which every event activates an edge that is chosen
+    uniformly at random. A run therefore boils down to one draw for the number of swaps and one draw for the sequence
+    of activated edges, after which the swaps are applied to a vertex-to-node permutation array.
+    """
+
+    # From this network size onwards, swaps are applied in layers of disjoint swaps with NumPy fancy indexing. For
+    # smaller networks the layers are too thin to amortize the overhead of NumPy calls, and a plain loop is faster.
+    LAYERED_THRESHOLD = 4096
+
+    def __init__(self, args, G = None, edges: Optional[np.ndarray] = None):
+        """
+        The graph can be given as an (E, 2) array of edges, which avoids iterating over a networkx graph every run.
+        """
+        self.args = args
+        self.swaps: int = 0
+        self.tracked_nodes: np.ndarray = get_tracked_nodes(self.args)
+        if edges is None:
+            edges = get_edge_array(G) if G else load_edges(self.args.nodes, self.args.k, self.args.seed)
+
+        self.edge_from: np.ndarray = edges[:, 0]
+        self.edge_to: np.ndarray = edges[:, 1]
+        self.nb_vertices: np.ndarray = get_nb_vertices(edges, self.args.nodes)
+
+        self.vertex_to_node: np.ndarray = np.arange(self.args.nodes, dtype=np.int32)
+        self.node_to_vertex: np.ndarray = np.arange(self.args.nodes, dtype=np.int32)
+        self.rng: Optional[np.random.Generator] = None
+        self.reset()
+
+    def reset(self, seed: Optional[int] = None):
+        """
+        Restore the initial permutation in place, so a single instance can be reused for many runs. Without a seed, the
+        next run is random.
+        """
+        self.swaps = 0
+        self.vertex_to_node[:] = np.arange(self.args.nodes, dtype=np.int32)
+        self.node_to_vertex[:] = self.vertex_to_node
+        self.rng = np.random.default_rng(seed)
+
+    def draw_activated_edges(self) -> np.ndarray:
+        num_swaps: int = self.rng.poisson(len(self.edge_from) * self.args.poisson_rate * self.args.time_per_run)
+        return self.rng.integers(0, len(self.edge_from), size=num_swaps, dtype=np.int32)
+
+    def apply_swaps_sequentially(self, from_vertices: np.ndarray, to_vertices: np.ndarray):
+        vertex_to_node = self.vertex_to_node.tolist()
+        for from_vertex, to_vertex in zip(from_vertices.tolist(), to_vertices.tolist()):
+            vertex_to_node[from_vertex], vertex_to_node[to_vertex] = vertex_to_node[to_vertex], vertex_to_node[from_vertex]
+        self.vertex_to_node[:] = vertex_to_node
+
+    def apply_swaps_layered(self, from_vertices: np.ndarray, to_vertices: np.ndarray):
+        """
+        Swaps on disjoint vertices commute, so a swap can be applied early as long as none of the swaps before it
+        touches one of its vertices. We repeatedly peel off the swaps that are the first pending swap on both of their
+        vertices and apply them together. The swap sequence is processed in windows of N swaps to bound the work per
+        layer.
+        """
+        first_swap: np.ndarray = np.empty(self.args.nodes, dtype=np.int32)
+        for window_start in range(0, len(from_vertices), self.args.nodes):
+            pending_from: np.ndarray = from_vertices[window_start:window_start + self.args.nodes]
+            pending_to: np.ndarray = to_vertices[window_start:window_start + self.args.nodes]
+            while len(pending_from):
+                swap_inds: np.ndarray = np.arange(len(pending_from), dtype=np.int32)
+                first_swap[pending_from] = len(pending_from)
+                first_swap[pending_to] = len(pending_from)
+                np.minimum.at(first_swap, pending_from, swap_inds)
+                np.minimum.at(first_swap, pending_to, swap_inds)
+                in_layer: np.ndarray = (first_swap[pending_from] == swap_inds) & (first_swap[pending_to] == swap_inds)
+
+                layer_from: np.ndarray = pending_from[in_layer]
+                layer_to: np.ndarray = pending_to[in_layer]
+                nodes_at_from: np.ndarray = self.vertex_to_node[layer_from]
+                self.vertex_to_node[layer_from] = self.vertex_to_node[layer_to]
+                self.vertex_to_node[layer_to] = nodes_at_from
+
+                pending_from = pending_from[~in_layer]
+                pending_to = pending_to[~in_layer]
+
+    def get_neighbour_of_tracked_nodes(self):
+        nbhs: np.ndarray = np.sort(self.vertex_to_node[self.nb_vertices[self.node_to_vertex[self.tracked_nodes]]], axis=1)
+        return {node: tuple(nbh) for node, nbh in zip(self.tracked_nodes.tolist(), nbhs.tolist())}
+
+    def run(self):
+        activated_edges: np.ndarray = self.draw_activated_edges()
+        from_vertices: np.ndarray = self.edge_from[activated_edges]
+        to_vertices: np.ndarray = self.edge_to[activated_edges]
+        if self.args.nodes >= self.LAYERED_THRESHOLD:
+            self.apply_swaps_layered(from_vertices, to_vertices)
+        else:
+            self.apply_swaps_sequentially(from_vertices, to_vertices)
+
+        self.node_to_vertex[self.vertex_to_node] = np.arange(self.args.nodes, dtype=np.int32)
+        self.swaps += len(activated_edges)
+
+
+class BatchedSimulation:
+    """
+    Advances a batch of independent basic-mode runs together. Every run is a row in an R x N vertex-to-node matrix,
+    and the i-th swap of all runs is applied in one fancy-indexing step. Runs with fewer than the maximum number of
+    swaps are padded with swaps of a vertex with itself, which leave the permutation untouched. Memory usage grows
+    linearly with the batch size.
+    """
+
+    def __init__(self, args, edges: np.ndarray, batch_size: int):
+        self.args = args
+        self.batch_size: int = batch_size
+        self.swaps: int = 0
+        self.tracked_nodes: np.ndarray = get_tracked_nodes(self.args)
+        self.edge_from: np.ndarray = edges[:, 0]
+        self.edge_to: np.ndarray = edges[:, 1]
+        self.nb_vertices: np.ndarray = get_nb_vertices(edges, self.args.nodes)
+
+        # The permutations of the largest batch, of which the first batch_size rows are used
+        self.permutations: np.ndarray = np.empty((batch_size, self.args.nodes), dtype=np.int32)
+        self.vertex_to_node: np.ndarray = self.permutations
+        self.rng: Optional[np.random.Generator] = None
+        self.reset()
+
+    def reset(self, seed: Optional[int] = None, batch_size: Optional[int] = None):
+        """
+        Restore the initial permutation of every run in the batch in place. A smaller batch size uses part of the
+        permutations of the batch this simulation was created with. Without a seed, the next batch is random.
+        """
+        if batch_size is not None:
+            self.batch_size = batch_size
+            self.vertex_to_node = self.permutations[:batch_size]
+        self.swaps = 0
+        self.vertex_to_node[:] = np.arange(self.args.nodes, dtype=np.int32)
+        self.rng = np.random.default_rng(seed)
+
+    def run(self):
+        num_edges: int = len(self.edge_from)
+        num_swaps: np.ndarray = self.rng.poisson(num_edges * self.args.poisson_rate * self.args.time_per_run,
+                                                 size=self.batch_size)
+        # Row i holds the i-th activated edge of every run
+        activated_edges: np.ndarray = self.rng.integers(0, num_edges, size=(num_swaps.max(initial=0), self.batch_size),
+                                                        dtype=np.int32)
+
+        # Work on flat indices so each step is a single gather and scatter
+        # int64, as the flat indices of large batches do not fit in an int32
+        row_offsets: np.ndarray = np.arange(self.batch_size, dtype=np.int64) * self.args.nodes
+        from_inds: np.ndarray = self.edge_from[activated_edges] + row_offsets
+        to_inds: np.ndarray = self.edge_to[activated_edges] + row_offsets
+        padding: np.ndarray = np.arange(activated_edges.shape[0])[:, None] >= num_swaps
+        to_inds[padding] = from_inds[padding]
+
+        vertex_to_node: np.ndarray = self.vertex_to_node.reshape(-1)
+        for step_from, step_to in zip(from_inds, to_inds):
+            nodes_at_from: np.ndarray = vertex_to_node.take(step_from)
+            vertex_to_node.put(step_from, vertex_to_node.take(step_to))
+            vertex_to_node.put(step_to, nodes_at_from)
+
+        self.swaps += int(num_swaps.sum())
+
+    def get_neighbourhoods_of_tracked_nodes(self) -> np.ndarray:
+        """
+        Return an R x T x k array with the sorted neighbourhood of each of the T tracked nodes in every run.
+        """
+        node_to_vertex: np.ndarray = np.empty_like(self.vertex_to_node)
+        np.put_along_axis(node_to_vertex, self.vertex_to_node,
+                          np.broadcast_to(np.arange(self.args.nodes, dtype=np.int32), self.vertex_to_node.shape), axis=1)
+        tracked_vertices: np.ndarray = node_to_vertex[:, self.tracked_nodes]
+        nb_vertices: np.ndarray = self.nb_vertices[tracked_vertices]
+        rows: np.ndarray = np.arange(self.batch_size)[:, None, None]
+        return np.sort(self.vertex_to_node[rows, nb_vertices], axis=2)
+
+
+class BackwardTracingSimulation:
+    """
+    Basic-mode simulator for when only a few nodes are tracked. Which edges fire does not depend on which node
+    occupies which vertex. We therefore only trace the tracked nodes forward through the swap log to find their final
+    vertices, and then trace the k neighbouring vertices backward to find the nodes that started there. Apart from the
+    swap log, a run takes O(k) memory per tracked node since the full permutation is never maintained.
+    """
+
+    def __init__(self, args, G = None, edges: Optional[np.ndarray] = None):
+        if args.track_all_nodes:
+            raise RuntimeError("Backward tracing does not support tracking all nodes")
+
+        self.args = args
+        self.swaps: int = 0
+        self.tracked_nodes: np.ndarray = get_tracked_nodes(self.args)
+        self.tracked_nbhs: Dict[int, Tuple[int, ...]] = {}
+        if edges is None:
+            edges = get_edge_array(G) if G else load_edges(self.args.nodes, self.args.k, self.args.seed)
+
+        self.edge_from: np.ndarray = edges[:, 0]
+        self.edge_to: np.ndarray = edges[:, 1]
+        self.nb_vertices: np.ndarray = get_nb_vertices(edges, self.args.nodes)
+        self.rng: Optional[np.random.Generator] = None
+        self.reset()
+
+    def reset(self, seed: Optional[int] = None):
+        """
+        Forget the previous run, so a single instance can be reused for many runs. Without a seed, the next run is
+        random.
+        """
+        self.swaps = 0
+        self.tracked_nbhs = {}
+        self.rng = np.random.default_rng(seed)
+
+    def draw_activated_edges(self) -> np.ndarray:
+        num_swaps: int = self.rng.poisson(len(self.edge_from) * self.args.poisson_rate * self.args.time_per_run)
+        return self.rng.integers(0, len(self.edge_from), size=num_swaps, dtype=np.int32)
+
+    def get_neighbour_of_tracked_nodes(self):
+        return self.tracked_nbhs
+
+    def run(self):
+        """
+        The endpoints of the i-th swap are stored at index 2i and 2i + 1 of the swap log, so the other endpoint of a
+        swap is found by flipping the last bit of an index. Sorting the log by vertex links each endpoint to the
+        previous and next swap on the same vertex, after which tracing a node only visits the swaps that move it.
+        """
+        activated_edges: np.ndarray = self.draw_activated_edges()
+        endpoints: np.ndarray = np.stack([self.edge_from[activated_edges], self.edge_to[activated_edges]], axis=1).reshape(-1)
+        log_size: int = len(endpoints)
+
+        # A stable sort on 16-bit keys is a radix sort, which is considerably faster
+        keys: np.ndarray = endpoints.astype(np.uint16) if self.args.nodes <= 1 << 16 else endpoints
+        order: np.ndarray = np.argsort(keys, kind="stable")
+        sorted_endpoints: np.ndarray = endpoints[order]
+        same_vertex: np.ndarray = sorted_endpoints[1:] == sorted_endpoints[:-1]
+        next_touch: np.ndarray = np.full(log_size, log_size, dtype=np.int64)
+        next_touch[order[:-1]] = np.where(same_vertex, order[1:], log_size)
+        prev_touch: np.ndarray = np.full(log_size, -1, dtype=np.int64)
+        prev_touch[order[1:]] = np.where(same_vertex, order[:-1], -1)
+
+        # The first and last swap on each vertex, which are at the boundaries of its run in the sorted log
+        vertex_start: np.ndarray = np.searchsorted(sorted_endpoints, np.arange(self.args.nodes + 1))
+        has_touches: np.ndarray = vertex_start[1:] > vertex_start[:-1]
+        first_touch: np.ndarray = np.where(has_touches, np.append(order, log_size)[vertex_start[:-1]], log_size)
+        last_touch: np.ndarray = np.where(has_touches, np.insert(order, 0, -1)[vertex_start[1:]], -1)
+
+        self.tracked_nbhs = {}
+        for node in self.tracked_nodes.tolist():
+            # Initially, node i sits at vertex i. Trace the tracked node forward to its final vertex.
+            vertex: int = node
+            ind: int = first_touch.item(vertex)
+            while ind < log_size:
+                vertex = endpoints.item(ind ^ 1)
+                ind = next_touch.item(ind ^ 1)
+
+            # Walking back in time from the neighbouring vertices tells us which nodes ended up there
+            nbh: List[int] = []
+            for nb_vertex in self.nb_vertices[vertex].tolist():
+                ind = last_touch.item(nb_vertex)
+                while ind >= 0:
+                    nb_vertex = endpoints.item(ind ^ 1)
+                    ind = prev_touch.item(ind ^ 1)
+                nbh.append(nb_vertex)
+            self.tracked_nbhs[node] = tuple(sorted(nbh))
+
+        self.swaps += len(activated_edges)
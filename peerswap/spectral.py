@@ -0,0 +1,84 @@
+import csv
+import os
+from typing import Dict, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import LinearOperator, eigsh
+
+from peerswap.graphs import GRAPH_CACHE_DIR, load_edges
+
+SPECTRAL_CACHE_FILE = os.path.join(GRAPH_CACHE_DIR, "spectral_expansion.csv")
+
+# Up to this many nodes, all eigenvalues are computed from the dense adjacency matrix
+MAX_DENSE_NODES = 256
+
+# Relative tolerance and number of Lanczos vectors of the iterative solver. The eigenvalues of a random regular graph
+# cluster near the largest one, and more Lanczos vectors than the default speed up convergence.
+EIGSH_TOL = 1e-8
+EIGSH_NCV = 40
+
+# Spectral expansions computed by this process or read from the cache, by (nodes, k, seed)
+spectral_cache: Dict[Tuple[int, int, int], float] = {}
+
+
+def get_adjacency_matrix(edges: np.ndarray, nodes: int) -> csr_matrix:
+    rows: np.ndarray = np.concatenate([edges[:, 0], edges[:, 1]])
+    cols: np.ndarray = np.concatenate([edges[:, 1], edges[:, 0]])
+    return csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(nodes, nodes))
+
+
+def compute_spectral_expansion(edges: np.ndarray, nodes: int, k: int) -> float:
+    """
+    Return the largest absolute eigenvalue of the adjacency matrix of a k-regular graph, apart from its top eigenvalue
+    k. The top eigenvalue belongs to the all-ones vector, so it is removed by projecting that vector out, after which
+    only the largest-magnitude eigenvalue of the sparse adjacency matrix is computed with an iterative solver.
+    """
+    A: csr_matrix = get_adjacency_matrix(edges, nodes)
+    if nodes <= MAX_DENSE_NODES:
+        eigenvalues: np.ndarray = np.linalg.eigvalsh(A.toarray())
+        return float(np.sort(np.abs(eigenvalues))[-2])
+
+    def deflated_matvec(x: np.ndarray) -> np.ndarray:
+        x = np.ravel(x)
+        return A @ x - k * x.mean()
+
+    operator = LinearOperator((nodes, nodes), matvec=deflated_matvec, dtype=np.float64)
+    # A fixed starting vector, orthogonal to the all-ones vector, keeps the result reproducible
+    v0: np.ndarray = np.random.default_rng(0).random(nodes)
+    eigenvalues = eigsh(operator, k=1, which="LM", v0=v0 - v0.mean(), tol=EIGSH_TOL, ncv=min(EIGSH_NCV, nodes - 1),
+                        return_eigenvectors=False)
+    return float(abs(eigenvalues[0]))
+
+
+def load_spectral_cache():
+    if spectral_cache or not os.path.exists(SPECTRAL_CACHE_FILE):
+        return
+    with open(SPECTRAL_CACHE_FILE) as in_file:
+        for row in csv.reader(in_file):
+            if row[0] == "nodes":
+                continue  # Concurrent writers can each write a header
+            spectral_cache[(int(row[0]), int(row[1]), int(row[2]))] = float(row[3])
+
+
+def save_spectral_expansion(nodes: int, k: int, seed: int, expansion: float):
+    """
+    Append a spectral expansion to the cache file. Single lines are appended at once, so concurrent writers do not
+    interleave.
+    """
+    spectral_cache[(nodes, k, seed)] = expansion
+    os.makedirs(GRAPH_CACHE_DIR, exist_ok=True)
+    write_header: bool = not os.path.exists(SPECTRAL_CACHE_FILE)
+    with open(SPECTRAL_CACHE_FILE, "a") as out_file:
+        out_file.write(("nodes,k,seed,lambda\n" if write_header else "") + "%d,%d,%d,%r\n" % (nodes, k, seed, expansion))
+
+
+def get_spectral_expansion(nodes: int, k: int, seed: int) -> float:
+    """
+    Return the spectral expansion of the random k-regular graph with the given seed, which is cached on disk.
+    """
+    load_spectral_cache()
+    if (nodes, k, seed) not in spectral_cache:
+        expansion: float = compute_spectral_expansion(load_edges(nodes, k, seed), nodes, k)
+        save_spectral_expansion(nodes, k, seed, expansion)
+    return spectral_cache[(nodes, k, seed)]
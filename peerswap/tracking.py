@@ -0,0 +1,22 @@
+import random
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def sample_tracked_nodes(nodes: int, count: int, seed: int) -> Tuple[int, ...]:
+    return tuple(sorted(random.Random(seed).sample(range(nodes), count)))
+
+
+def get_tracked_nodes(args) -> np.ndarray:
+    """
+    Return the sorted nodes whose neighbourhoods are tracked: all nodes, a random sample of --track-nodes nodes, or only
+    node 0. The sample only depends on the seed, so every process tracks the same nodes.
+    """
+    if args.track_all_nodes:
+        return np.arange(args.nodes)
+    if args.track_nodes:
+        return np.array(sample_tracked_nodes(args.nodes, args.track_nodes, args.seed))
+    return np.array([0])
@@ -1,8 +1,53 @@
+import copy
 import logging
+import multiprocessing
 import os
+from functools import partial
+from typing import Tuple
 
 from args import get_args
-from simulation import Simulation
+from main import get_edges, get_lock_state, get_simulation, init_worker
+from peerswap.simulation_lock import SimulationWithLock
+
+
+def run_configuration(task: Tuple[str, int, int], args) -> Tuple[str, int, int, int]:
+    max_network_latency, swaps_per_sec, run = task
+    args = copy.copy(args)
+    if max_network_latency == "realistic":
+        args.latencies_file = "data/latencies.txt"
+        args.max_network_latency = 0
+        print("Running with realistic traces and swaps/sec %d (run %d)" % (swaps_per_sec, run + 1))
+    else:
+        max_network_latency_in_ms = int(max_network_latency)
+        print("Running with max latency %d ms and swaps/sec %d (run %d)" % (max_network_latency_in_ms, swaps_per_sec, run + 1))
+        args.max_network_latency = max_network_latency_in_ms / 1000
+        args.latencies_file = None
+
+    edges: int = int((args.k * args.nodes) / 2)
+    poisson_rate = 1 / (edges / swaps_per_sec)
+    args.poisson_rate = poisson_rate
+
+    # The graph and latencies are shared by all runs of a worker with the same latency configuration, and the simulation
+    # by consecutive runs with the same configuration
+    graph_edges = get_edges(args)
+    lock_state = get_lock_state(args)
+    latency_model = lock_state["latency_model"]
+    while True:
+        try:
+            if args.redraw_latencies and lock_state["used"]:
+                latency_model.redraw()
+            lock_state["used"] = True
+            simulation = get_simulation(args, lambda: SimulationWithLock(args, latency_model=latency_model,
+                                                                         edges=graph_edges), (latency_model,))
+            simulation.run()
+            break
+        except Exception as exc:
+            logging.exception(exc)
+            print("Whoops - failed, trying that again")
+
+    group = "traces" if max_network_latency == "realistic" else "0-%d ms" % max_network_latency_in_ms
+    return group, swaps_per_sec, simulation.swaps, simulation.failed_swaps
+
 
 if __name__ == "__main__":
     args = get_args()
@@ -11,32 +56,16 @@ if __name__ == "__main__":
     args.k = 5
     logging.basicConfig(level=getattr(logging, args.log_level))
 
+    tasks = [(max_network_latency, swaps_per_sec, run)
+             for max_network_latency in ["20", "50", "100", "realistic"]
+             for swaps_per_sec in [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+             for run in range(5)]
+
+    cpus_to_use = args.cpus or max(1, multiprocessing.cpu_count() - 2)
     with open(os.path.join("data", "success_rate_with_latency.csv"), "w") as out_file:
         out_file.write("max_network_delay,swaps_per_sec,success,fail\n")
-        for max_network_latency in ["20", "50", "100", "realistic"]:
-            for swaps_per_sec in [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]:
-                for run in range(5):
-                    if max_network_latency == "realistic":
-                        args.latencies_file = "data/latencies.txt"
-                        args.max_network_latency = 0
-                        print("Running with realistic traces and swaps/sec %d (run %d)" % (swaps_per_sec, run + 1))
-                    else:
-                        max_network_latency_in_ms = int(max_network_latency)
-                        print("Running with max latency %d ms and swaps/sec %d (run %d)" % (max_network_latency_in_ms, swaps_per_sec, run + 1))
-                        args.max_network_latency = max_network_latency_in_ms / 1000
-                        args.latencies_file = None
-
-                    edges: int = int((args.k * args.nodes) / 2)
-                    poisson_rate = 1 / (edges / swaps_per_sec)
-                    args.poisson_rate = poisson_rate
-
-                    while True:
-                        try:
-                            simulation = Simulation(args)
-                            simulation.run()
-                            break
-                        except:
-                            print("Whoops - failed, trying that again")
-
-                    group = "traces" if max_network_latency == "realistic" else "0-%d ms" % max_network_latency_in_ms
-                    out_file.write("%s,%d,%d,%d\n" % (group, swaps_per_sec, simulation.swaps, simulation.failed_swaps))
+        with multiprocessing.Pool(cpus_to_use, initializer=init_worker, initargs=(args,)) as pool:
+            # The rows are written in the order of the grid, as soon as they are done
+            for row in pool.imap(partial(run_configuration, args=args), tasks):
+                out_file.write("%s,%d,%d,%d\n" % row)
+                out_file.flush()
@@ -1,64 +1,96 @@
-import csv
+"""
+Compare the neighbourhood frequencies of every tracked node with the synthetic, uniform frequencies with a two-sample
+KS test, for graphs with different spectral expansions. The frequency files are read in chunks into integer arrays, and
+the seeds are analyzed on a process pool.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+from typing import List, Tuple
 
-import networkx as nx
 import numpy as np
 from scipy.stats import kstest
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-def compute_spectral_expansion(G):
-    # Compute the adjacency matrix of the graph
-    A = nx.adjacency_matrix(G).toarray()
+from peerswap.spectral import get_spectral_expansion
 
-    # Compute the eigenvalues of the adjacency matrix
-    eigenvalues = np.linalg.eigvals(A)
+SEEDS = [451221, 421462, 884124, 534785, 556343, 519038, 688720, 510637, 343170, 96032]
 
-    eigenvalues = sorted(eigenvalues, key=abs, reverse=True)
+# Number of rows of a frequency file that are parsed at once
+CHUNK_ROWS = 1000000
 
-    # Remove the largest, absolute eigenvalue
-    eigenvalues = eigenvalues[1:]
-    lambda_max = abs(eigenvalues[0])
-    return lambda_max
 
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=64)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--time-per-run", type=float, default=4)
+    parser.add_argument("--seeds", type=int, nargs="+", default=SEEDS)
+    parser.add_argument("--data-dir", type=str, default="../data/exp5")
+    parser.add_argument("--synthetic-file", type=str,
+                        default="../data/exp4/n_64_k_4_t_4_s_42_synthetic/nbh_frequencies.csv")
+    parser.add_argument("--output", type=str, default="../data/exp5/ks_results.csv")
+    parser.add_argument("--cpus", type=int, default=None)
+    return parser.parse_args()
 
-SEEDS = [451221, 421462, 884124, 534785, 556343, 519038, 688720, 510637, 343170, 96032]
-N = 64
-K = 4
-synthetic_freqs = []
-ks_results_file = "../data/exp5/ks_results.csv"
-with open(ks_results_file, "w") as out_file:
-    out_file.write("seed,lambda,tracked_node,distance,pvalue\n")
-
-
-# Load synthetic data
-print("Loading synthetic data")
-with open("../data/exp4/n_64_k_4_t_4_s_42_synthetic/nbh_frequencies.csv") as in_file:
-    reader = csv.reader(in_file)
-    next(reader)
-    for row in reader:
-        synthetic_freqs.append(int(row[-1]))
-
-freqs = []
-for seed in SEEDS:
-    G = nx.random_regular_graph(K, N, seed=seed)
-    l = compute_spectral_expansion(G)
-    print("Considering seed %d (lambda: %f)" % (seed, l))
-    with open("../data/exp5/n_64_k_4_t_4_s_%s/nbh_frequencies.csv" % seed) as in_file:
-        rows_read = 0
-        reader = csv.reader(in_file)
-        next(reader)  # Skip the header
-        node_evaluated = 0
-        for row in reader:
-            if rows_read % 100000 == 0:
-                print("Read %d rows..." % rows_read)
-
-            tracked_node = int(row[5])
-            if tracked_node != node_evaluated:
-                kstest_results = kstest(synthetic_freqs, freqs)
-                freqs = []
-                with open(ks_results_file, "a") as results_file:
-                    results_file.write("%d,%f,%d,%f,%f\n" % (seed, l, node_evaluated, kstest_results.statistic, kstest_results.pvalue))
-                node_evaluated = tracked_node
-
-            freq = int(row[-1])
-            freqs.append(freq)
-            rows_read += 1
+
+def read_columns(file_name: str, columns: List[str]) -> np.ndarray:
+    """
+    Read the given integer columns of a CSV file with a header into an M x len(columns) array, in chunks of rows.
+    """
+    chunks: List[np.ndarray] = []
+    with open(file_name) as in_file:
+        header: List[str] = in_file.readline().strip().split(",")
+        usecols: List[int] = [header.index(column) for column in columns]
+        while True:
+            lines: List[str] = list(itertools.islice(in_file, CHUNK_ROWS))
+            if not lines:
+                break
+            chunks.append(np.loadtxt(lines, delimiter=",", usecols=usecols, dtype=np.int64, ndmin=2))
+    return np.concatenate(chunks) if chunks else np.empty((0, len(columns)), dtype=np.int64)
+
+
+def analyze_seed(task: Tuple[str, np.ndarray]) -> List[Tuple[int, float, float]]:
+    """
+    Return the tracked node, KS distance and p-value of every tracked node in a neighbourhood frequency file.
+    """
+    file_name, synthetic_freqs = task
+    rows: np.ndarray = read_columns(file_name, ["tracked_node", "freq"])
+
+    # Group the frequencies by tracked node
+    order: np.ndarray = np.argsort(rows[:, 0], kind="stable")
+    tracked_nodes, freqs = rows[order, 0], rows[order, 1]
+    boundaries: np.ndarray = np.flatnonzero(np.diff(tracked_nodes)) + 1
+    results: List[Tuple[int, float, float]] = []
+    for start, node_freqs in zip(np.concatenate(([0], boundaries)).tolist(), np.split(freqs, boundaries)):
+        if len(node_freqs) == 0:
+            continue
+        kstest_results = kstest(synthetic_freqs, node_freqs)
+        results.append((int(tracked_nodes[start]), kstest_results.statistic, kstest_results.pvalue))
+    return results
+
+
+if __name__ == "__main__":
+    args = get_args()
+    cpus_to_use = args.cpus or max(1, multiprocessing.cpu_count() - 2)
+
+    print("Loading synthetic data")
+    synthetic_freqs: np.ndarray = read_columns(args.synthetic_file, ["freq"])[:, 0]
+
+    # The spectral expansions are cached, so they are computed before the workers start
+    expansions: List[float] = [get_spectral_expansion(args.nodes, args.k, seed) for seed in args.seeds]
+    tasks = [(os.path.join(args.data_dir, "n_%d_k_%d_t_%g_s_%d" % (args.nodes, args.k, args.time_per_run, seed),
+                           "nbh_frequencies.csv"), synthetic_freqs) for seed in args.seeds]
+
+    lines: List[str] = []
+    with multiprocessing.Pool(min(cpus_to_use, len(tasks))) as pool:
+        for seed, l, seed_results in zip(args.seeds, expansions, pool.imap(analyze_seed, tasks)):
+            print("Analyzed seed %d (lambda: %f, %d tracked nodes)" % (seed, l, len(seed_results)))
+            lines += ["%d,%f,%d,%f,%f\n" % ((seed, l) + node_results) for node_results in seed_results]
+
+    with open(args.output, "w") as out_file:
+        out_file.write("seed,lambda,tracked_node,distance,pvalue\n")
+        out_file.writelines(lines)
@@ -0,0 +1,56 @@
+"""
+Benchmark the event queue backends of the lock-based simulator with a hold model: the queue is filled with one clock
+event per edge of a k-regular graph, after which we repeatedly pop the earliest event and schedule its next clock fire.
+The sorted list that the simulator used before is included as a reference.
+"""
+import bisect
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from peerswap.event_queue import EVENT_QUEUES
+
+K = 5
+POISSON_RATE = 1.0
+EVENTS = 200000
+NODES = [1000, 10000, 100000]
+
+
+class SortedListEventQueue:
+
+    def __init__(self):
+        self.events = []
+
+    def push(self, time, index, item):
+        bisect.insort(self.events, (time, index, item))
+
+    def pop(self):
+        return self.events.pop(0)
+
+
+def hold(queue, edges: int, events: int) -> float:
+    rng = np.random.default_rng(42)
+    delays = rng.exponential(scale=1 / POISSON_RATE, size=edges + events).tolist()
+    for index in range(edges):
+        queue.push(delays[index], index, None)
+
+    start_time = time.time()
+    for index in range(edges, edges + events):
+        event_time, _, _ = queue.pop()
+        queue.push(event_time + delays[index], index, None)
+    return events / (time.time() - start_time)
+
+
+queues = dict(EVENT_QUEUES)
+queues["sorted_list"] = SortedListEventQueue
+print("queue,nodes,k,edges,events_per_sec")
+for nodes in NODES:
+    edges = nodes * K // 2
+    for name, queue_cls in queues.items():
+        # The sorted list is quadratic, so only replay a fraction of the events for it
+        events = EVENTS if name != "sorted_list" else EVENTS // 10
+        print("%s,%d,%d,%d,%d" % (name, nodes, K, edges, hold(queue_cls(), edges, events)))
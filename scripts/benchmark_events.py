@@ -0,0 +1,46 @@
+"""
+Micro-benchmark of the number of events per second that the lock-based simulator processes.
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from args import get_args
+from peerswap.graphs import load_edges
+from peerswap.latency import create_latency_model
+from peerswap.simulation_lock import SimulationWithLock
+
+RUNS = 5
+
+
+class CountingSimulation(SimulationWithLock):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.events_processed: int = 0
+
+    def process_event(self, event):
+        self.events_processed += 1
+        super().process_event(event)
+
+
+args = get_args(["--nodes", "1024", "--k", "5", "--time-per-run", "60", "--poisson-rate", "0.02",
+                 "--max-network-latency", "0.05"] + sys.argv[1:])
+# Warnings of the simulator are suppressed by default (--log-level ERROR), so log lines are not part of the timing
+logging.basicConfig(level=getattr(logging, args.log_level))
+edges = load_edges(args.nodes, args.k, args.seed)
+latency_model = create_latency_model(args)
+
+events: int = 0
+duration: float = 0
+for _ in range(RUNS):
+    simulation = CountingSimulation(args, latency_model=latency_model, edges=edges)
+    start_time = time.time()
+    simulation.run()
+    duration += time.time() - start_time
+    events += simulation.events_processed
+
+print("Processed %d events in %f s. (%d events/s.)" % (events, duration, events / duration))
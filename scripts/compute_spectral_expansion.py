@@ -1,8 +1,11 @@
+import os
 import statistics
+import sys
 from math import log
 
-import networkx as nx
-import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from peerswap.spectral import get_spectral_expansion
 
 # Create a k-regular graph, for example a 3-regular graph
 k = 4
@@ -10,73 +13,11 @@ n = 64  # number of nodes
 epsilon = 1 / 100
 
 
-def compute_spectral_expansion(G):
-    # Compute the adjacency matrix of the graph
-    A = nx.adjacency_matrix(G).toarray()
-
-    # Compute the eigenvalues of the adjacency matrix
-    eigenvalues = np.linalg.eigvals(A)
-
-    eigenvalues = sorted(eigenvalues, key=abs, reverse=True)
-    print(eigenvalues)
-
-    # Remove the largest, absolute eigenvalue
-    eigenvalues = eigenvalues[1:]
-    lambda_max = abs(eigenvalues[0])
-
-    eigenvalues = sorted(eigenvalues)
-    spectral_gap = eigenvalues[-1] - eigenvalues[-2]
-    print("exp: ", lambda_max)
-    print("Spectral Gap:", spectral_gap)
-
-    return lambda_max
-
-
 expansions = []
 for seed in range(42, 47):
-    G = nx.random_regular_graph(k, n, seed=seed)
-    l = compute_spectral_expansion(G)
+    l = get_spectral_expansion(n, k, seed)
     expansions.append(l)
 
 print(statistics.mean(expansions))
 
-# expansions = []
-# for seed in range(1, 1000000):
-#     G = nx.random_regular_graph(k, n, seed=seed)
-#
-#     if seed % 10000 == 0:
-#         print("Computed %d seeds..." % seed)
-#
-#     # Compute T
-#     l = compute_spectral_expansion(G)
-#     expansions.append((l, seed))
-#     #print("Spectral expansion: %f" % l)
-#     # T = log(n / epsilon, 2) / (k * l)
-#     # print("T: %f" % T)
-#
-#
-# def pick_evenly_spaced_values(array, num_items):
-#     # Determine the range of the first elements
-#     min_val, max_val = array[0][0], array[-1][0]
-#     value_range = max_val - min_val
-#     segment_length = value_range / (num_items - 1)
-#
-#     selected_tuples = []
-#     for i in range(num_items):
-#         # Calculate the target value for this segment
-#         target_value = min_val + i * segment_length
-#
-#         # Find the tuple closest to the target value (based on the first element)
-#         closest_tuple = min(array, key=lambda x: abs(x[0] - target_value))
-#         selected_tuples.append(closest_tuple)
-#
-#     return selected_tuples
-#
-#
-# samples = 10
-# expansions = sorted(expansions)
-# selected_expansions = pick_evenly_spaced_values(expansions, samples)
-# with open("spectral_expansion_graphs.csv", "w") as out_file:
-#     out_file.write("seed,lambda\n")
-#     for l, seed in selected_expansions:
-#         out_file.write("%d,%f\n" % (seed, l))
+# Seeds with evenly spaced spectral expansions, as in spectral_expansion_graphs.csv, are found with search_seeds.py
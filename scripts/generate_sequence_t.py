@@ -1,11 +1,13 @@
 """
 Generate a sequence of T when increasing the number of nodes.
 """
+import os
+import sys
 from math import log
 
-import networkx as nx
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-from compute_spectral_expansion import compute_spectral_expansion
+from peerswap.spectral import get_spectral_expansion
 
 epsilon = 1 / 100
 
@@ -16,7 +18,6 @@ with open("../data/sequence_t.csv", "w") as out_file:
         for nodes in [32, 64, 128, 256, 512, 1024, 2048]:
             print("Computing for %d nodes..." % nodes)
             for ind in range(5):
-                G = nx.random_regular_graph(k, nodes, seed=42 + ind)
-                l = compute_spectral_expansion(G)
+                l = get_spectral_expansion(nodes, k, 42 + ind)
                 T = log(nodes / epsilon, 2) / (k * l)
                 out_file.write("%d,%d,%d,%f\n" % (nodes, k, 42 + ind, T))
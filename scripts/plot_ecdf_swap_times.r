@@ -1,10 +1,14 @@
 library(ggplot2)
 library(dplyr)
 
-dat <- read.csv("data/exp7/swap_times.csv")
+# The swap times are histogram bins with their counts, so the ECDF is the cumulative share of the counts
+dat <- read.csv("data/exp7/swap_times.csv") %>%
+       group_by(max_network_latency) %>%
+       arrange(swap_time, .by_group = TRUE) %>%
+       mutate(ecdf = cumsum(count) / sum(count))
 
-p <- ggplot(dat, aes(x=swap_time, group=max_network_latency, color=max_network_latency, linetype=max_network_latency)) +
-     stat_ecdf() +
+p <- ggplot(dat, aes(x=swap_time, y=ecdf, group=max_network_latency, color=max_network_latency, linetype=max_network_latency)) +
+     geom_step() +
      scale_color_discrete(name = "Network Delay") +
      scale_linetype_discrete(name = "Network Delay") +
      theme_bw() +
@@ -39,14 +39,19 @@ p <- ggplot(dat, aes(x=swaps_per_sec, y=throughput, group=max_network_delay, col
 ggsave("data/exp7/throughput_with_latency.pdf", p, width=4.8, height=2.3)
 
 
-dat_swap_time <- read.csv("data/exp7/swap_times.csv")
+# The swap times are histogram bins with their counts, so the ECDF is the cumulative share of the counts
+dat_swap_time <- read.csv("data/exp7/swap_times.csv") %>%
+                 group_by(max_network_latency) %>%
+                 arrange(swap_time, .by_group = TRUE) %>%
+                 mutate(ecdf = cumsum(count) / sum(count)) %>%
+                 ungroup()
 dat_swap_time$max_network_latency <- factor(dat_swap_time$max_network_latency, levels = c("0-20 ms", "0-50 ms", "0-100 ms", "traces"))
 
 dat_filtered <- dat_swap_time[dat_swap_time$max_network_latency == "traces",]
-print(mean(dat_filtered$swap_time))
+print(weighted.mean(dat_filtered$swap_time, dat_filtered$count))
 
-p2 <- ggplot(dat_swap_time, aes(x=swap_time, group=max_network_latency, color=max_network_latency, linetype=max_network_latency)) +
-      stat_ecdf() +
+p2 <- ggplot(dat_swap_time, aes(x=swap_time, y=ecdf, group=max_network_latency, color=max_network_latency, linetype=max_network_latency)) +
+      geom_step() +
       scale_color_discrete(name = "Network Delay") +
       scale_linetype_discrete(name = "Network Delay") +
       theme_bw() +
@@ -6,8 +6,5 @@ K=4
 T_values=(1 2 3 4)
 RUNS_PER_PROCESS=992775
 
-for T in "${T_values[@]}"
-do
-  echo "Running with T=$T"
-  python3 main.py --runs-per-process $RUNS_PER_PROCESS --nodes $N --k $K --time-per-run $T --cpus $CPUS
-done
\ No newline at end of file
+# All values of T run on the same pool of workers, and values of T that are already done are skipped
+python3 sweep.py --runs-per-process $RUNS_PER_PROCESS --nodes $N --k $K --time-per-run "${T_values[@]}" --cpus $CPUS
\ No newline at end of file
@@ -0,0 +1,124 @@
+"""
+Search for seeds of random regular graphs with evenly spaced spectral expansions. The expansions of all seeds are
+computed on a process pool and streamed to a CSV file, so an interrupted search continues where it left off.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from typing import List, Tuple
+
+import numpy as np
+from networkx import random_regular_graph
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from peerswap.graphs import get_edge_array
+from peerswap.spectral import compute_spectral_expansion
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Number of seeds that are handed to a worker at once
+BLOCK_SIZE = 1000
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=64)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--first-seed", type=int, default=1)
+    parser.add_argument("--seeds", type=int, default=1000000)
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--cpus", type=int, default=None)
+    # The (seed, lambda) pairs of all seeds searched so far
+    parser.add_argument("--results-file", type=str, default=None)
+    parser.add_argument("--output", type=str, default=os.path.join(SCRIPTS_DIR, "spectral_expansion_graphs.csv"))
+    args = parser.parse_args()
+    if args.results_file is None:
+        args.results_file = os.path.join(SCRIPTS_DIR, "..", "data", "seed_search",
+                                         "n_%d_k_%d.csv" % (args.nodes, args.k))
+    return args
+
+
+def compute_expansions(task: Tuple[np.ndarray, int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    seeds, nodes, k = task
+    # Graphs are not written to the graph cache, as most of them are never used again
+    expansions: np.ndarray = np.array([compute_spectral_expansion(
+        get_edge_array(random_regular_graph(k, nodes, seed=int(seed))), nodes, k) for seed in seeds])
+    return seeds, expansions
+
+
+def load_results(results_file: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the seeds and expansions in the results file. A line that was cut off by an interruption is removed.
+    """
+    if not os.path.exists(results_file):
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    with open(results_file, "rb+") as results:
+        data: bytes = results.read()
+        if data and not data.endswith(b"\n"):
+            results.truncate(data.rfind(b"\n") + 1)
+        if data.count(b"\n") <= 1:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+    results_array: np.ndarray = np.loadtxt(results_file, delimiter=",", skiprows=1, ndmin=2)
+    return results_array[:, 0].astype(np.int64), results_array[:, 1]
+
+
+def pick_evenly_spaced_values(seeds: np.ndarray, expansions: np.ndarray, num_items: int) -> List[Tuple[float, int]]:
+    """
+    For evenly spaced targets between the smallest and the largest expansion, pick the seed with the closest expansion.
+    Ties are broken by the smaller expansion and then the smaller seed.
+    """
+    order: np.ndarray = np.lexsort((seeds, expansions))
+    sorted_expansions: np.ndarray = expansions[order]
+    targets: np.ndarray = np.linspace(sorted_expansions[0], sorted_expansions[-1], num_items)
+
+    above: np.ndarray = np.clip(np.searchsorted(sorted_expansions, targets), 1, len(order) - 1)
+    below: np.ndarray = above - 1
+    closest: np.ndarray = np.where(targets - sorted_expansions[below] <= sorted_expansions[above] - targets, below, above)
+    # Move to the first of a run of equal expansions, which has the smallest seed
+    closest = np.searchsorted(sorted_expansions, sorted_expansions[closest])
+    return [(sorted_expansions[ind], seeds[order[ind]]) for ind in closest]
+
+
+if __name__ == "__main__":
+    args = get_args()
+    cpus_to_use = args.cpus or max(1, multiprocessing.cpu_count() - 2)
+
+    done_seeds, expansions = load_results(args.results_file)
+    all_seeds: np.ndarray = np.arange(args.first_seed, args.first_seed + args.seeds)
+    remaining_seeds: np.ndarray = np.setdiff1d(all_seeds, done_seeds)
+    print("Computing the spectral expansion of %d seeds (%d already done) on %d CPUs..." %
+          (len(remaining_seeds), len(all_seeds) - len(remaining_seeds), cpus_to_use))
+
+    os.makedirs(os.path.dirname(args.results_file), exist_ok=True)
+    with open(args.results_file, "a") as out_file:
+        if out_file.tell() == 0:
+            out_file.write("seed,lambda\n")
+
+        tasks = [(block, args.nodes, args.k) for block in
+                 np.array_split(remaining_seeds, max(1, len(remaining_seeds) // BLOCK_SIZE)) if len(block)]
+        seed_blocks: List[np.ndarray] = [done_seeds]
+        expansion_blocks: List[np.ndarray] = [expansions]
+        seeds_done: int = len(all_seeds) - len(remaining_seeds)
+        with multiprocessing.Pool(cpus_to_use) as pool:
+            for block_seeds, block_expansions in pool.imap_unordered(compute_expansions, tasks):
+                # Every block is written at once, so an interruption can only cut off the last line
+                rows = zip(block_seeds.tolist(), block_expansions.tolist())
+                out_file.write("".join("%d,%r\n" % row for row in rows))
+                out_file.flush()
+                seed_blocks.append(block_seeds)
+                expansion_blocks.append(block_expansions)
+                seeds_done += len(block_seeds)
+                print("\rSeeds done: %d/%d" % (seeds_done, len(all_seeds)), end="", flush=True)
+    print()
+    done_seeds, expansions = np.concatenate(seed_blocks), np.concatenate(expansion_blocks)
+
+    # Only the seeds in the requested range are considered
+    in_range: np.ndarray = (done_seeds >= all_seeds[0]) & (done_seeds <= all_seeds[-1])
+    selected_expansions = pick_evenly_spaced_values(done_seeds[in_range], expansions[in_range], args.samples)
+    with open(args.output, "w") as out_file:
+        out_file.write("seed,lambda\n")
+        for l, seed in selected_expansions:
+            out_file.write("%d,%f\n" % (seed, l))
@@ -1,40 +1,71 @@
+import multiprocessing
 import os
-import random
 import shutil
-from collections import defaultdict
+import sys
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from peerswap.neighbourhoods import NeighbourhoodEncoder
+from peerswap.results import merge_key_counts
 
 N = 8192 * 4
 K = 4
 T = 4
 RUNS = N * 100 // K
 
-for seed in range(42, 43):
-    print("Running for seed %d..." % seed)
-    nbh_freqs = defaultdict(lambda: 0)
-    node_freqs = defaultdict(lambda: 0)
-
-    for run in range(RUNS):
-        if run % 1000000 == 0:
-            print("Generated %d neighbourhoods..." % run)
-
-        nbh = tuple(sorted(random.sample(range(0, N - 1), K)))
-        nbh_freqs[nbh] += 1
-        for peer in nbh:
-            node_freqs[peer] += 1
-
-    data_dir = os.path.join("..", "data", "n_%d_k_%d_t_%g_s_%d_synthetic" % (N, K, T, seed))
-    if os.path.exists(data_dir):
-        shutil.rmtree(data_dir)
-    os.makedirs(data_dir, exist_ok=True)
-
-    # Write away the frequencies
-    with open(os.path.join(data_dir, "nbh_frequencies.csv"), "w") as out_file:
-        out_file.write("algorithm,nodes,k,time_per_run,seed,nbh,freq\n")
-        for nbh, freq in nbh_freqs.items():
-            nbh_str = "-".join(["%d" % peer for peer in nbh])
-            out_file.write("synthetic,%d,%d,%g,42,%s,%d\n" % (N, K, T, nbh_str, freq))
-
-    with open(os.path.join(data_dir, "frequencies.csv"), "w") as out_file:
-        out_file.write("algorithm,nodes,k,time_per_run,seed,node,freq\n")
-        for node, freq in node_freqs.items():
-            out_file.write("synthetic,%d,%d,%g,42,%d,%d\n" % (N, K, T, node, freq))
+# Neighbourhoods are drawn in blocks of this many, which are spread over the worker processes
+BLOCK_SIZE = 1000000
+CPUS = max(1, multiprocessing.cpu_count() - 2)
+
+
+def sample_block(task: Tuple[np.random.SeedSequence, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Draw uniformly random k-subsets of the N - 1 other nodes. Every subset has exactly one combinadic code, so drawing a
+    uniform code yields a uniform subset.
+    """
+    seed_sequence, size = task
+    encoder = NeighbourhoodEncoder(N, K)
+    codes: np.ndarray = np.random.default_rng(seed_sequence).integers(0, encoder.num_neighbourhoods, size=size)
+    nbh_codes, nbh_freqs = np.unique(codes, return_counts=True)
+    node_freqs: np.ndarray = np.bincount(encoder.decode(nbh_codes).ravel(), weights=np.repeat(nbh_freqs, K),
+                                         minlength=N).astype(np.int64)
+    return nbh_codes, nbh_freqs, node_freqs
+
+
+if __name__ == "__main__":
+    encoder = NeighbourhoodEncoder(N, K)
+
+    for seed in range(42, 43):
+        print("Running for seed %d..." % seed)
+        block_sizes: List[int] = [min(BLOCK_SIZE, RUNS - start) for start in range(0, RUNS, BLOCK_SIZE)]
+        tasks = list(zip(np.random.SeedSequence(seed).spawn(len(block_sizes)), block_sizes))
+
+        # Count the neighbourhoods by their combinadic code, and only decode the ones we have seen
+        code_blocks: List[np.ndarray] = []
+        freq_blocks: List[np.ndarray] = []
+        node_freqs = np.zeros(N, dtype=np.int64)
+        with multiprocessing.Pool(CPUS) as pool:
+            for block_codes, block_freqs, block_node_freqs in pool.imap_unordered(sample_block, tasks):
+                code_blocks.append(block_codes)
+                freq_blocks.append(block_freqs)
+                node_freqs += block_node_freqs
+        nbh_codes, nbh_freqs = merge_key_counts(code_blocks, freq_blocks)
+        print("Generated %d neighbourhoods..." % nbh_freqs.sum())
+
+        data_dir = os.path.join("..", "data", "n_%d_k_%d_t_%g_s_%d_synthetic" % (N, K, T, seed))
+        if os.path.exists(data_dir):
+            shutil.rmtree(data_dir)
+        os.makedirs(data_dir, exist_ok=True)
+
+        # Write away the frequencies
+        prefix: str = "synthetic,%d,%d,%g,42," % (N, K, T)
+        np.savetxt(os.path.join(data_dir, "nbh_frequencies.csv"), np.column_stack((encoder.decode(nbh_codes), nbh_freqs)),
+                   fmt=prefix + "-".join(["%d"] * K) + ",%d", header="algorithm,nodes,k,time_per_run,seed,nbh,freq",
+                   comments="")
+
+        nodes: np.ndarray = np.flatnonzero(node_freqs)
+        np.savetxt(os.path.join(data_dir, "frequencies.csv"), np.column_stack((nodes, node_freqs[nodes])),
+                   fmt=prefix + "%d,%d", header="algorithm,nodes,k,time_per_run,seed,node,freq", comments="")
@@ -0,0 +1,80 @@
+import argparse
+import itertools
+import logging
+import multiprocessing
+import shlex
+from collections import defaultdict
+from typing import Dict, List, Set
+
+from args import get_args
+from main import Experiment, is_complete, get_data_dir, run_experiments
+
+# Options of main.py that can take a list of values, of which the sweep runs the cartesian product
+GRID_OPTIONS = ["nodes", "k", "time_per_run", "seed", "poisson_rate", "max_network_latency"]
+
+
+def get_sweep_args():
+    parser = argparse.ArgumentParser(description="Run a grid of configurations of main.py on a single pool of workers. "
+                                                 "All other options are passed on to main.py.",
+                                     allow_abbrev=False)
+    parser.add_argument("--nodes", type=int, nargs="+")
+    parser.add_argument("--k", type=int, nargs="+")
+    parser.add_argument("--time-per-run", type=float, nargs="+")
+    parser.add_argument("--seed", type=int, nargs="+")
+    parser.add_argument("--poisson-rate", type=float, nargs="+")
+    parser.add_argument("--max-network-latency", type=float, nargs="+")
+    # A file with the main.py options of one configuration per line, for configurations that are not a grid, e.g., with a
+    # number of runs per (n, k). The grid is applied to every line.
+    parser.add_argument("--configs", type=str, default=None)
+    # Run configurations that are already complete again
+    parser.add_argument("--rerun", action=argparse.BooleanOptionalAction)
+    return parser.parse_known_args()
+
+
+def get_configurations(sweep_args, main_argv: List[str]) -> List[argparse.Namespace]:
+    config_lines: List[List[str]] = [[]]
+    if sweep_args.configs:
+        with open(sweep_args.configs) as in_file:
+            config_lines = [shlex.split(line) for line in in_file if line.strip() and not line.startswith("#")]
+
+    grid_values = [getattr(sweep_args, option) or [None] for option in GRID_OPTIONS]
+    configurations: List[argparse.Namespace] = []
+    for config_line in config_lines:
+        for values in itertools.product(*grid_values):
+            argv: List[str] = main_argv + config_line
+            for option, value in zip(GRID_OPTIONS, values):
+                if value is not None:
+                    argv += ["--%s" % option.replace("_", "-"), str(value)]
+            configurations.append(get_args(argv))
+    return configurations
+
+
+if __name__ == "__main__":
+    sweep_args, main_argv = get_sweep_args()
+    configurations = get_configurations(sweep_args, main_argv)
+    logging.basicConfig(level=getattr(logging, configurations[0].log_level))
+
+    cpus_to_use = configurations[0].cpus or max(1, multiprocessing.cpu_count() - 2)
+    print("Will start %d experiments on %d CPUs..." % (len(configurations), cpus_to_use))
+
+    # Configurations that would share a data directory but have different Poisson rates get the rate in their name
+    rates: Dict[str, Set[float]] = defaultdict(set)
+    for args in configurations:
+        rates[get_data_dir(args)].add(args.poisson_rate)
+
+    experiments: List[Experiment] = []
+    data_dirs = set()
+    for args in configurations:
+        data_dir = get_data_dir(args, with_rate=len(rates[get_data_dir(args)]) > 1)
+        if data_dir in data_dirs:
+            continue
+        data_dirs.add(data_dir)
+        if is_complete(data_dir) and not sweep_args.rerun:
+            print("Skipping %s, which is already complete" % data_dir)
+            continue
+
+        # Incomplete configurations continue from their last checkpoint
+        args.resume = not sweep_args.rerun
+        experiments.append(Experiment(args, args.cpus or cpus_to_use, data_dir))
+
+    run_experiments(experiments, cpus_to_use, configurations[0])